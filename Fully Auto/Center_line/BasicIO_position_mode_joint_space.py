@@ -1,12 +1,15 @@
 "THIS IS FOR COMPLETELY MANUAL TELOPERATION, EACH JOINT IS CONTROLLED MANUALLY"
 import os
 import sys
+import argparse
 import numpy as np
 import pygame
 sys.path.append(r"C:\Users\hitis\Documents\Quanser\0_libraries\python")
 from pal.products.qarm import QArm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jog import run_jog
 
-def main():
+def main(jog=False):
     # Initialize pygame with minimal setup
     pygame.init()
     screen = pygame.display.set_mode((300, 200), pygame.HWSURFACE | pygame.DOUBLEBUF)
@@ -64,6 +67,13 @@ def main():
         pygame.time.delay(1000)  # More efficient than time.sleep()
         print("Reached home.")
 
+        if jog:
+            # Held keys move joints continuously at a fixed control rate
+            print("Jog mode: hold a key to move, release to stop.")
+            run_jog(myArm, joint_angles, gripper, led_cmd, KEY_MAPPINGS, JOINT_LIMITS)
+            pygame.quit()
+            return
+
         running = True
         clock = pygame.time.Clock()  # For controlling frame rate
         
@@ -113,4 +123,6 @@ def main():
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Manual joint-space teleoperation")
+    parser.add_argument("--jog", action="store_true", help="continuous velocity jogging while keys are held")
+    main(parser.parse_args().jog)
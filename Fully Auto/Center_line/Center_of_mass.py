@@ -1,72 +1,76 @@
 # Fruit Centerline Detection and Gripper Line Drawing with Angle, Direction, and Auto Saving
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
 from scipy.ndimage import center_of_mass
 import os
+import sys
+import csv
 import math
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 
-# Global to store fruit name for saving
-fruit_name = "fruit"
+save_dir = r"C:\Users\hitis\Desktop\Applied Robotics\Report\Codes\Fully Auto\Center_line\Results"
 
-def detect_and_crop_fruit(image, fruit_type):
-    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+# HSV colour ranges per fruit (OpenCV hue is 0-179)
+FRUIT_HSV_RANGES = {
+    'banana': [((20, 100, 100), (30, 255, 255))],
+    'tomato': [((0, 100, 100), (10, 255, 255)), ((160, 100, 100), (179, 255, 255))],
+    'strawberry': [((0, 100, 100), (10, 255, 255))],
+}
 
-    if fruit_type == 'banana':
-        lower = np.array([20, 100, 100])
-        upper = np.array([30, 255, 255])
-    elif fruit_type == 'tomato':
-        lower1 = np.array([0, 100, 100])
-        upper1 = np.array([10, 255, 255])
-        lower2 = np.array([160, 100, 100])
-        upper2 = np.array([179, 255, 255])
-    elif fruit_type == 'strawberry':
-        lower = np.array([0, 100, 100])
-        upper = np.array([10, 255, 255])
-    else:
+MORPH_KERNEL = np.ones((5, 5), np.uint8)
+
+def fruit_mask(image, fruit_type):
+    if fruit_type not in FRUIT_HSV_RANGES:
         raise ValueError("Unknown fruit type!")
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
 
-    if fruit_type == 'tomato':
-        mask1 = cv2.inRange(hsv, lower1, upper1)
-        mask2 = cv2.inRange(hsv, lower2, upper2)
-        mask = cv2.bitwise_or(mask1, mask2)
-    else:
-        mask = cv2.inRange(hsv, lower, upper)
+    mask = None
+    for lower, upper in FRUIT_HSV_RANGES[fruit_type]:
+        part = cv2.inRange(hsv, np.array(lower), np.array(upper))
+        mask = part if mask is None else cv2.bitwise_or(mask, part)
 
-    kernel = np.ones((5, 5), np.uint8)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, MORPH_KERNEL)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, MORPH_KERNEL)
+    return mask
 
+def detect_fruit_bbox(image, fruit_type):
+    # Bounding box (x, y, w, h) of the largest blob of the fruit's colour, or None
+    mask = fruit_mask(image, fruit_type)
     contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
     if len(contours) == 0:
+        return None
+    largest_contour = max(contours, key=cv2.contourArea)
+    return cv2.boundingRect(largest_contour)
+
+def detect_and_crop_fruit(image, fruit_type):
+    bbox = detect_fruit_bbox(image, fruit_type)
+    if bbox is None:
         print("No fruit detected, using original image.")
         return image
 
-    largest_contour = max(contours, key=cv2.contourArea)
-    x, y, w, h = cv2.boundingRect(largest_contour)
-
+    x, y, w, h = bbox
     cropped = image[y:y+h, x:x+w]
     return cropped
 
-def calculate_alignment_angle_and_draw(image, show_plot=True):
+def compute_alignment(image):
+    # Display-free part of the orientation estimate.
+    # Returns None, or (angle_deg, direction, gripper_direction, (com_x, com_y), largest_contour, gray)
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     _, binary = cv2.threshold(gray, 100, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
 
-    kernel = np.ones((5, 5), np.uint8)
-    cleaned = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
-    cleaned = cv2.morphologyEx(cleaned, cv2.MORPH_CLOSE, kernel)
+    cleaned = cv2.morphologyEx(binary, cv2.MORPH_OPEN, MORPH_KERNEL)
+    cleaned = cv2.morphologyEx(cleaned, cv2.MORPH_CLOSE, MORPH_KERNEL)
 
     contours, _ = cv2.findContours(cleaned, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     if len(contours) == 0:
-        print("No object detected!")
         return None
 
     largest_contour = max(contours, key=cv2.contourArea)
     points = largest_contour.reshape(-1, 2).astype(np.float32)
 
     if len(points) < 5:
-        print("Not enough points for PCA. Skipping.")
         return None
 
     mean, eigenvectors = cv2.PCACompute(points, mean=None, maxComponents=2)
@@ -81,10 +85,40 @@ def calculate_alignment_angle_and_draw(image, show_plot=True):
     angle_rad = math.atan2(dy, dx)
     angle_deg = math.degrees(angle_rad) % 180
     direction = "clockwise" if 0 <= angle_deg <= 90 else "anticlockwise"
+    return angle_deg, direction, gripper_direction, (com_x, com_y), largest_contour, gray
+
+def mask_orientation(mask, min_area=150):
+    # Fast orientation for the live cycle: one cv2.moments pass over a binary mask
+    # instead of center_of_mass + contours + PCACompute.
+    # Returns None, or (angle_deg, (com_x, com_y), elongation) where angle_deg is the
+    # gripper direction (0-180, same convention as compute_alignment) and elongation
+    # the major/minor axis ratio (~1 for round fruit, where the angle means little)
+    m = cv2.moments(mask, binaryImage=True)
+    if m["m00"] < min_area:
+        return None
+    mu20, mu02, mu11 = m["mu20"], m["mu02"], m["mu11"]
+    # Major axis of the second-moment ellipse
+    theta = 0.5 * math.atan2(2 * mu11, mu20 - mu02)
+    spread = math.hypot(2 * mu11, mu20 - mu02)
+    major, minor = (mu20 + mu02 + spread) / 2, (mu20 + mu02 - spread) / 2
+    elongation = math.sqrt(major / max(minor, 1e-9))
+    # Gripper closes across the fruit, perpendicular to the major axis
+    angle_deg = (math.degrees(theta) + 90.0) % 180
+    return angle_deg, (m["m10"] / m["m00"], m["m01"] / m["m00"]), elongation
+
+def calculate_alignment_angle_and_draw(image, show_plot=True, fruit_name="fruit", save=None):
+    # save defaults to show_plot, as before
+    save = show_plot if save is None else save
+    result = compute_alignment(image)
+    if result is None:
+        print("No object detected!")
+        return None
+    angle_deg, direction, gripper_direction, (com_x, com_y), largest_contour, gray = result
+
     print(f"Angle: {angle_deg:.1f}°")
     print(f"Direction: {direction}")
 
-    if show_plot:
+    if show_plot or save:
         output = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
         height, width = output.shape[:2]
         line_length = max(height, width) * 2
@@ -111,14 +145,17 @@ def calculate_alignment_angle_and_draw(image, show_plot=True):
         cv2.putText(output, f"Angle: {angle_deg:.1f}°", (text_x, text_y), font, font_scale, (0, 0, 0), thickness)
         cv2.putText(output, f"Direction: {direction}", (text_x, text_y + 30), font, font_scale, (0, 0, 0), thickness)
 
+    if show_plot:
+        # Imported here so batch workers never load matplotlib
+        import matplotlib.pyplot as plt
         plt.figure(figsize=(8, 10))
         plt.imshow(cv2.cvtColor(output, cv2.COLOR_BGR2RGB))
         plt.title("Gripper Line and Orientation")
         plt.axis('off')
         plt.show()
 
+    if save:
         # Save the image to specified path
-        save_dir = r"C:\Users\hitis\Desktop\Applied Robotics\Report\Codes\Fully Auto\Center_line\Results"
         os.makedirs(save_dir, exist_ok=True)
         file_name = f"{fruit_name}_{angle_deg:.1f}deg_{direction}.jpg"
         save_path = os.path.join(save_dir, file_name)
@@ -128,20 +165,221 @@ def calculate_alignment_angle_and_draw(image, show_plot=True):
     return gripper_direction
 
 def process_fruit_image(image_path, fruit_type):
-    global fruit_name
-    fruit_name = fruit_type  # Store globally for filename use
-
     if not os.path.exists(image_path):
         print(f"Image path {image_path} does not exist!")
         return
 
     image = cv2.imread(image_path)
     cropped = detect_and_crop_fruit(image, fruit_type)
-    gripper_direction = calculate_alignment_angle_and_draw(cropped)
+    gripper_direction = calculate_alignment_angle_and_draw(cropped, fruit_name=fruit_type)
     if gripper_direction is not None:
         print(f"Gripper direction vector: {gripper_direction}")
 
+# === ROI tracking (live streams) ===
+class FruitTracker:
+    # Remembers the last bounding box and segments only an expanded window around
+    # it; falls back to a full-frame search when the fruit is lost from the window.
+    def __init__(self, fruit_type, margin=0.5, min_pad=16, min_area=150, redetect_every=0):
+        if fruit_type not in FRUIT_HSV_RANGES:
+            raise ValueError("Unknown fruit type!")
+        self.fruit_type = fruit_type
+        self.margin = margin                  # window grows by this fraction of the box size per side
+        self.min_pad = min_pad                # ... but by at least this many pixels
+        self.min_area = min_area              # smaller blobs count as "lost"
+        self.redetect_every = redetect_every  # forced full-frame search every N frames (0 = never)
+        self.bbox = None
+        self.frames = 0
+        self.full_searches = 0
+
+    def reset(self):
+        self.bbox = None
+
+    def _roi(self, shape):
+        x, y, w, h = self.bbox
+        pad_x = max(self.min_pad, int(self.margin * w))
+        pad_y = max(self.min_pad, int(self.margin * h))
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1, y1 = min(shape[1], x + w + pad_x), min(shape[0], y + h + pad_y)
+        return x0, y0, x1, y1
+
+    def _search(self, image, x0=0, y0=0):
+        mask = fruit_mask(image, self.fruit_type)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if len(contours) == 0:
+            return None
+        largest_contour = max(contours, key=cv2.contourArea)
+        if cv2.contourArea(largest_contour) < self.min_area:
+            return None
+        x, y, w, h = cv2.boundingRect(largest_contour)
+        return x + x0, y + y0, w, h
+
+    def update(self, image):
+        # Bounding box (x, y, w, h) in full-image coordinates, or None
+        self.frames += 1
+        bbox = None
+        forced = self.redetect_every and self.frames % self.redetect_every == 0
+        if self.bbox is not None and not forced:
+            x0, y0, x1, y1 = self._roi(image.shape)
+            bbox = self._search(image[y0:y1, x0:x1], x0, y0)
+        if bbox is None:
+            self.full_searches += 1
+            bbox = self._search(image)
+        self.bbox = bbox
+        return bbox
+
+    def crop(self, image):
+        bbox = self.update(image)
+        if bbox is None:
+            return None, None
+        x, y, w, h = bbox
+        return image[y:y + h, x:x + w], bbox
+
+# === Headless batch mode ===
+RESULT_DTYPE = np.dtype([
+    ('image', 'O'), ('fruit', 'U16'), ('found', '?'), ('angle_deg', 'f8'),
+    ('direction', 'U13'), ('com_x', 'f8'), ('com_y', 'f8'), ('dir_x', 'f8'), ('dir_y', 'f8')
+])
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+def _init_worker():
+    # One OpenCV thread per process; the pool provides the parallelism
+    cv2.setNumThreads(1)
+
+def analyse_image(task):
+    # Worker: (path, fruit_type, draw) -> one RESULT_DTYPE row as a tuple.
+    # COM is in full-image pixel coordinates.
+    image_path, fruit_type, draw = task
+    image = cv2.imread(image_path)
+    if image is None:
+        return (image_path, fruit_type, False, np.nan, "", np.nan, np.nan, np.nan, np.nan)
+
+    bbox = detect_fruit_bbox(image, fruit_type)
+    x0, y0 = (0, 0) if bbox is None else bbox[:2]
+    cropped = image if bbox is None else image[y0:y0 + bbox[3], x0:x0 + bbox[2]]
+
+    result = compute_alignment(cropped)
+    if result is None:
+        return (image_path, fruit_type, False, np.nan, "", np.nan, np.nan, np.nan, np.nan)
+    angle_deg, direction, gripper_direction, (com_x, com_y), _, _ = result
+    if draw:
+        calculate_alignment_angle_and_draw(cropped, show_plot=False, fruit_name=fruit_type, save=True)
+    return (image_path, fruit_type, True, angle_deg, direction, com_x + x0, com_y + y0,
+            gripper_direction[0], gripper_direction[1])
+
+def list_images(paths):
+    # Expand directories into their image files
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            images.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            ))
+        else:
+            images.append(path)
+    return images
+
+def batch_process(images, fruit_type, workers=None, draw=False, chunksize=8):
+    # images: directory, path or list of them; fruit_type: one type or one per image
+    if isinstance(images, str):
+        images = [images]
+    images = list_images(images)
+    fruit_types = [fruit_type] * len(images) if isinstance(fruit_type, str) else list(fruit_type)
+    tasks = [(path, fruit, draw) for path, fruit in zip(images, fruit_types)]
+
+    if workers == 1:
+        rows = [analyse_image(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            rows = list(pool.map(analyse_image, tasks, chunksize=chunksize))
+    return np.array(rows, dtype=RESULT_DTYPE)
+
+def save_csv(results, path):
+    # csv quotes paths that contain commas; image paths are stored untruncated (object dtype)
+    fmt = ["%s", "%s", "%d", "%.3f", "%s", "%.2f", "%.2f", "%.5f", "%.5f"]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(results.dtype.names)
+        for row in results:
+            writer.writerow([f % value for f, value in zip(fmt, row.tolist())])
+
+def main_batch(argv):
+    parser = argparse.ArgumentParser(description="Batch fruit orientation (headless)")
+    parser.add_argument("images", nargs="+", help="image files and/or directories")
+    parser.add_argument("--fruit", required=True, choices=sorted(FRUIT_HSV_RANGES))
+    parser.add_argument("--out", default="orientation_results.csv", help="CSV output path")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--draw", action="store_true", help="also save annotated images to the Results folder")
+    args = parser.parse_args(argv)
+
+    results = batch_process(args.images, args.fruit, args.workers, args.draw)
+    save_csv(results, args.out)
+    print(f"Processed {len(results)} images ({int(results['found'].sum())} with an orientation) -> {args.out}")
+
+# === Live mode ===
+def main_live(argv):
+    parser = argparse.ArgumentParser(description="Live fruit orientation from the RealSense (ROI tracking)")
+    parser.add_argument("--fruit", required=True, choices=sorted(FRUIT_HSV_RANGES))
+    parser.add_argument("--seconds", type=float, default=60.0, help="run time")
+    parser.add_argument("--no-display", action="store_true", help="print results only (headless)")
+    parser.add_argument("--redetect-every", type=int, default=0, help="force a full-frame search every N frames")
+    args = parser.parse_args(argv)
+
+    # Camera comes from the shared backend selector (QARM_BACKEND=sim works without hardware)
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from qarm_backend import QArmRealSense
+
+    # Single core: the point of tracking is that one thread keeps up with the camera
+    cv2.setNumThreads(1)
+    tracker = FruitTracker(args.fruit, redetect_every=args.redetect_every)
+    frames, busy = 0, 0.0
+    with QArmRealSense(mode='RGB&DEPTH', hardware=0, deviceID=0,
+                       frameWidthRGB=640, frameHeightRGB=480,
+                       frameWidthDepth=640, frameHeightDepth=480, readMode=1) as myCam:
+        t0 = time.time()
+        while time.time() - t0 < args.seconds:
+            if myCam.read_RGB() <= 0:
+                continue
+            start = time.perf_counter()
+            frame = myCam.imageBufferRGB
+            cropped, bbox = tracker.crop(frame)
+            result = compute_alignment(cropped) if cropped is not None else None
+            busy += time.perf_counter() - start
+            frames += 1
+
+            if args.no_display:
+                if result is not None and frames % 30 == 0:
+                    print(f"Angle: {result[0]:.1f}° ({result[1]}), bbox {bbox}")
+                continue
+            output = frame.copy()
+            if bbox is not None:
+                x, y, w, h = bbox
+                cv2.rectangle(output, (x, y), (x + w, y + h), (0, 255, 0), 2)
+                if result is not None:
+                    angle_deg, _, gripper_direction, (com_x, com_y), _, _ = result
+                    c = np.array([x + com_x, y + com_y])
+                    d = 60 * np.asarray(gripper_direction)
+                    cv2.line(output, tuple(int(v) for v in c - d), tuple(int(v) for v in c + d), (255, 0, 0), 3)
+                    cv2.putText(output, f"Angle: {angle_deg:.1f}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+            cv2.imshow("Fruit orientation", output)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+
+    if frames:
+        print(f"{frames} frames, {1e3 * busy / frames:.2f} ms processing per frame, "
+              f"{tracker.full_searches} full-frame searches")
+    if not args.no_display:
+        cv2.destroyAllWindows()
+
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["--live"]:
+        main_live(sys.argv[2:])
+        sys.exit()
+    if len(sys.argv) > 1:
+        main_batch(sys.argv[1:])
+        sys.exit()
+
     while True:
         input_image_path = input("Enter the path to the image (or 'q' to quit): ").strip()
         if input_image_path.lower() == 'q':
@@ -1,8 +1,14 @@
-from pal.products.qarm import QArmRealSense
+import os
+import sys
 import numpy as np
 import time
 import cv2
 
+# Shared modules live one folder up (Fully Auto)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from qarm_backend import QArmRealSense
+from camera_service import CameraService
+
 # -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- --
 ## Timing Parameters and methods
 startTime = time.time()
@@ -22,24 +28,32 @@ max_distance = 1 # meters (for depth camera)
 # -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- --
 ## Initialize the RealSense camera for RGB and Depth data
 # change hardware to 1 if using a physical arm instead of a virtual one.
-with QArmRealSense(mode='RGB&DEPTH',
-                   hardware=0,
-                   deviceID= 0,
-                   frameWidthRGB=imageWidth,
-                   frameHeightRGB=imageHeight,
-                   frameWidthDepth=imageWidth,
-                   frameHeightDepth=imageHeight,
-                   readMode = 1) as myCam1:
+# Frames are acquired on the camera service's thread; this loop only displays them.
+with CameraService(QArmRealSense(mode='RGB&DEPTH',
+                                 hardware=0,
+                                 deviceID= 0,
+                                 frameWidthRGB=imageWidth,
+                                 frameHeightRGB=imageHeight,
+                                 frameWidthDepth=imageWidth,
+                                 frameHeightDepth=imageHeight,
+                                 readMode = 1)) as myCam1:
 
     t0 = time.time()
+    last_seq = -1
     while time.time() - t0 < runTime:
 
+        # Newest RGB frame and the depth frame closest to it in time, without waiting
+        pair = myCam1.latest_pair()
+        if pair is None or pair[0].seq == last_seq:
+            cv2.waitKey(1)
+            continue
+        rgb, depth = pair
+        last_seq = rgb.seq
+        counter += 1
 
-        # cameras will only give data when new data is available
-        myCam1.read_RGB()
-        cv2.imshow('My RGB', myCam1.imageBufferRGB)
-
-        myCam1.read_depth()
-        cv2.imshow('My Depth', myCam1.imageBufferDepthPX/max_distance)
+        cv2.imshow('My RGB', rgb.image)
+        cv2.imshow('My Depth', depth.image/max_distance)
 
         cv2.waitKey(1)
+
+    print(f"Displayed {counter} frames in {elapsed_time():.1f} s")
@@ -1,63 +1,118 @@
 import os
 import sys
+import queue
+import atexit
+import argparse
+import threading
 import numpy as np
 import time
 import cv2
 
-# Add QArm library paths
-sys.path.append(r"C:\Users\hitis\Documents\Quanser\0_libraries\python")
-sys.path.append(r"C:\Users\hitis\Documents\Quanser\5_research\qarm\basic")
-
-from pal.products.qarm import QArm, QArmRealSense
-from hal.products.qarm import QArmUtilities
+# QArm classes: Quanser hardware by default, simulator with QARM_BACKEND=sim
+from qarm_backend import QArm, QArmRealSense, QArmUtilities
 
 # Import your classification module
-from fruit_ident import classify_and_log
+from fruit_ident import classify_and_log, start_loading
+from motion import wait_for_motion, wait_for_gripper, print_move_summary
+from pose_registry import PoseRegistry, within_limits, cache_path_for
+from pick_point import load_calibration, estimate_pick_point, grasp_gamma
+from multi_fruit import find_fruits, plan_pick_order
+from data_logger import get_logger
+from frame_archiver import FrameArchiver
+from camera_service import CameraService
+from trajectory import Trajectory, stream
+import instrumentation
+from instrumentation import timer, count, instrument_method
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Center_line"))
+from Center_of_mass import fruit_mask, FRUIT_HSV_RANGES
+
+# Stream a time-parameterised trajectory for each move instead of a single set-point jump
+stream_moves = False
+# Pick at the fruit's depth-based 3D position instead of always at Pick_pose
+use_depth_pick = True
+# Turn the wrist to the fruit's orientation (needs the wrist calibration)
+use_grasp_angle = True
+# Re-send a move that timed out this many times before aborting the cycle
+move_retries = 1
+
+positions = {
+    "home": [0.40, 0, 0.30],
+    "Pick_pose": [0.65, 0, 0.30],
+    "R_tom": [-0.25, -0.4, 0.05],
+    "R_ban": [-0.2, -0.5, 0.05],
+    "R_str": [-0.3, -0.3, 0.05],
+    "U_tom": [-0.35, -0.1, 0.05],
+    "U_ban": [-0.42, 0.1, 0.05],
+    "U_str": [-0.4, 0.3, 0.05],
+    "Rott": [-0.1, 0.4, 0.05]
+}
+
+thresholds = {
+    "banana_ripe": 3, "banana_unripe": 3,
+    "tomato_ripe": 5, "tomato_unripe": 5,
+    "strawberry_ripe": 6, "strawberry_unripe": 6
+}
 
 def check_ik_solution_validity(phiCmd):
     return not np.any(np.isnan(phiCmd))
 
 def move_to_position(myArm, myArmUtilities, position, gamma, gripCmd, led_cmd, label):
-    _, phiCmd = myArmUtilities.qarm_inverse_kinematics(position, gamma, myArm.measJointPosition[0:4])
+    with timer("ik_seconds", "Inverse kinematics solve"):
+        _, phiCmd = myArmUtilities.qarm_inverse_kinematics(position, gamma, myArm.measJointPosition[0:4])
     if not check_ik_solution_validity(phiCmd):
         print(f"Unreachable position: {label}")
         return None
-    myArm.read_write_std(phiCMD=phiCmd, gprCMD=gripCmd, baseLED=led_cmd)
-    time.sleep(2)
-    print(f"Moved to {label} position.")
+    command_joints(myArm, phiCmd, gripCmd, led_cmd, label)
     return phiCmd
 
-def main():
-    led_cmd = np.array([0, 1, 0], dtype=np.float64)
-    np.set_printoptions(precision=2, suppress=True)
+def move_to_pose(myArm, registry, name, gripCmd, led_cmd, label):
+    # Named poses come straight from the precomputed joint-space cache
+    phiCmd = registry.joints(name)
+    command_joints(myArm, phiCmd, gripCmd, led_cmd, label)
+    return phiCmd
 
-    print("--- Full Auto: Camera or Upload → Classify → Pick → Sort → Repeat ---\n")
+def command_joints(myArm, phiCmd, gripCmd, led_cmd, label):
+    # Raises if the arm never reaches the target, so the gripper doesn't act at the wrong pose
+    for attempt in range(move_retries + 1):
+        start = time.perf_counter()
+        if stream_moves:
+            stream(myArm, Trajectory([myArm.measJointPosition[0:4], phiCmd]), gripCmd, led_cmd)
+        else:
+            myArm.read_write_std(phiCMD=phiCmd, gprCMD=gripCmd, baseLED=led_cmd)
+        reached, duration = wait_for_motion(myArm, phiCmd, gripCmd, led_cmd, label, since=start)
+        if reached:
+            print(f"Moved to {label} position in {duration:.2f} s.")
+            return
+        if attempt < move_retries:
+            print(f"Warning: {label} position not reached, retrying the move.")
+    raise RuntimeError(f"Arm did not reach the {label} position; stopping the cycle.")
+
+arm_utilities = QArmUtilities()
+
+def load_registry(gamma=0):
+    # Solves (or loads) IK for every named pose; raises on a bad pose before the arm moves
+    return PoseRegistry(positions, arm_utilities, gamma, cache_path_for("full_auto"))
 
-    positions = {
-        "home": [0.40, 0, 0.30],
-        "Pick_pose": [0.65, 0, 0.30],
-        "R_tom": [-0.25, -0.4, 0.05],
-        "R_ban": [-0.2, -0.5, 0.05],
-        "R_str": [-0.3, -0.3, 0.05],
-        "U_tom": [-0.35, -0.1, 0.05],
-        "U_ban": [-0.42, 0.1, 0.05],
-        "U_str": [-0.4, 0.3, 0.05],
-        "Rott": [-0.1, 0.4, 0.05]
-    }
-
-    counters = {
-        "banana_ripe": 0, "banana_unripe": 0,
-        "tomato_ripe": 0, "tomato_unripe": 0,
-        "strawberry_ripe": 0, "strawberry_unripe": 0
-    }
-
-    thresholds = {
-        "banana_ripe": 3, "banana_unripe": 3,
-        "tomato_ripe": 5, "tomato_unripe": 5,
-        "strawberry_ripe": 6, "strawberry_unripe": 6
-    }
-
-    with QArm(hardware=0) as myArm, QArmRealSense(
+def instrument_devices(myArm, myCam):
+    # Time every arm I/O call and camera read (no-op unless metrics are enabled)
+    instrument_method(myArm, "read_write_std", "read_write_std_seconds", "QArm read_write_std round trip")
+    instrument_method(myCam.camera, "read_RGB", "camera_read_seconds", "RealSense read_RGB")
+    instrument_method(myCam.camera, "read_depth", "camera_depth_read_seconds", "RealSense read_depth")
+
+def start_metrics(port=None, path=None):
+    if port is None and path is None:
+        return
+    instrumentation.enable()
+    if port is not None:
+        instrumentation.start_http_server(port)
+    if path is not None:
+        instrumentation.start_file_exporter(path)
+        atexit.register(instrumentation.write_prometheus, path)
+
+def open_camera():
+    # Frames are acquired continuously on the camera service's thread
+    return CameraService(QArmRealSense(
         mode='RGB&DEPTH',
         hardware=0,
         deviceID=0,
@@ -65,97 +120,164 @@ def main():
         frameHeightRGB=480,
         frameWidthDepth=640,
         frameHeightDepth=480,
-        readMode=0
-    ) as myCam:
+        readMode=1
+    ))
 
-        myArmUtilities = QArmUtilities()
-        gamma = 0
+def new_counters():
+    return {key: 0 for key in thresholds}
 
-        while True:
-            gripCmd = 0.0
+def update_counters(counters, fruit, quality):
+    key = f"{fruit}_{quality}"
+    if key in counters:
+        counters[key] += 1
+        print(f"Counter [{key}]: {counters[key]} / {thresholds[key]}")
+        if counters[key] >= thresholds[key]:
+            print(f"Move {quality} {fruit} conveyor by 1")
+            counters[key] = 0
+
+def destination_for(fruit, quality):
+    if quality == "ripe":
+        return {"banana": "R_ban", "tomato": "R_tom", "strawberry": "R_str"}.get(fruit)
+    if quality == "unripe":
+        return {"banana": "U_ban", "tomato": "U_tom", "strawberry": "U_str"}.get(fruit)
+    if quality == "rotten":
+        return "Rott"
+    return None
+
+# === Cycle stages ===
+def capture_rgbd(myCam, archiver=None):
+    # First BGR frame + aligned depth (m) acquired after this call. Both are views into
+    # the camera service's ring and stay valid until this thread captures again.
+    print("Capturing image from RealSense...")
+    rgb, depth = myCam.capture()
+    if archiver is not None:
+        path = archiver.save(rgb.image)
+        if path is not None:
+            print(f"Archiving RGB image to: {path}")
+    return rgb.image, None if depth is None else depth.image
+
+def capture_image(myCam, archiver=None):
+    return capture_rgbd(myCam, archiver)[0]
 
+def locate_fruit(frame, depth, fruit, calibration):
+    # Base-frame pick target and wrist gamma from the fruit's colour mask and depth,
+    # or (None, 0.0) for Pick_pose
+    if depth is None or calibration is None or fruit not in FRUIT_HSV_RANGES:
+        return None, 0.0
+    with timer("pick_point_seconds", "Mask + depth -> 3D pick point and grasp angle"):
+        mask = fruit_mask(frame, fruit)
+        pick_point = estimate_pick_point(mask, depth, calibration)
+        gamma = grasp_gamma(mask, pick_point.position, calibration) if pick_point is not None and use_grasp_angle else 0.0
+    if pick_point is None:
+        print("No usable depth on the fruit, using Pick_pose.")
+        return None, 0.0
+    print(f"Fruit at {np.round(pick_point.position, 3)} m ({pick_point.n_points} depth points), "
+          f"wrist {np.rad2deg(gamma):.0f} deg")
+    return pick_point.position, gamma
+
+def classify(source):
+    # source is an image path (upload) or a BGR camera frame (handed over in memory)
+    fruit, quality = classify_and_log(source, bgr=isinstance(source, np.ndarray))
+    count("classified_total", help_text="Fruit classified")
+    print(f"Identified: {fruit}, Quality: {quality}")
+    return fruit, quality
+
+def open_archiver(archive_dir):
+    return FrameArchiver(archive_dir) if archive_dir else None
+
+def go_home(myArm, registry, gripCmd, led_cmd):
+    return move_to_pose(myArm, registry, "home", gripCmd, led_cmd, "HOME")
+
+def solve_pick(myArm, target, gamma=0):
+    with timer("ik_seconds", "Inverse kinematics solve"):
+        _, phiCmd = arm_utilities.qarm_inverse_kinematics(target, gamma, myArm.measJointPosition[0:4])
+    if not check_ik_solution_validity(phiCmd) or not within_limits(phiCmd):
+        print(f"Pick point {np.round(target, 3)} is out of reach.")
+        return None
+    return phiCmd
+
+def pick(myArm, registry, led_cmd, target=None, gamma=0):
+    # Move to the fruit (or the fixed Pick_pose when there is no target) and close gripper
+    phiCmd = solve_pick(myArm, target, gamma) if target is not None else None
+    if phiCmd is None:
+        if target is not None:
+            print("Using Pick_pose.")
+        phiCmd = move_to_pose(myArm, registry, "Pick_pose", 0.0, led_cmd, "PICK")
+    else:
+        command_joints(myArm, phiCmd, 0.0, led_cmd, "PICK")
+    myArm.read_write_std(phiCMD=phiCmd, gprCMD=1.0, baseLED=led_cmd)
+    wait_for_gripper(myArm, phiCmd, 1.0, led_cmd, "GRIP CLOSE")
+    print("Gripper closed at PICK position.")
+    return phiCmd
+
+def place(myArm, registry, destination_key, led_cmd):
+    # Move to destination and release
+    phiCmd = move_to_pose(myArm, registry, destination_key, 1.0, led_cmd, f"PLACE - {destination_key}")
+    myArm.read_write_std(phiCMD=phiCmd, gprCMD=0.0, baseLED=led_cmd)
+    wait_for_gripper(myArm, phiCmd, 0.0, led_cmd, "GRIP OPEN")
+    print("Gripper opened to place item.")
+    return phiCmd
+
+def main(archive_dir=None):
+    # Load the classifier in the background while the arm initialises and homes
+    launch_time = time.perf_counter()
+    start_loading()
+    get_logger()  # open the log database before the arm moves
+    first_pick_reported = False
+
+    led_cmd = np.array([0, 1, 0], dtype=np.float64)
+    np.set_printoptions(precision=2, suppress=True)
+
+    print("--- Full Auto: Camera or Upload → Classify → Pick → Sort → Repeat ---\n")
+
+    counters = new_counters()
+    registry = load_registry()
+    archiver = open_archiver(archive_dir)
+    calibration = load_calibration() if use_depth_pick else None
+
+    with QArm(hardware=0) as myArm, open_camera() as myCam:
+        instrument_devices(myArm, myCam)
+
+        while True:
             # Step 1: Move to Home
-            phiCmd = move_to_position(myArm, myArmUtilities, np.array(positions["home"]), gamma, gripCmd, led_cmd, "HOME")
-            if phiCmd is None: break
+            go_home(myArm, registry, 0.0, led_cmd)
 
             # Step 2: Ask for image source
             method = input("Use camera or upload image? (camera/upload): ").strip().lower()
+            depth = None
             if method == "camera":
-                print("Capturing image from RealSense...")
-                myCam.read_RGB()
-                timestamp = time.strftime("%Y%m%d-%H%M%S")
-                rgb_filename = f"rgb_{timestamp}.png"
-                cv2.imwrite(rgb_filename, myCam.imageBufferRGB)
-                print(f"Saved RGB image to: {rgb_filename}")
+                source, depth = capture_rgbd(myCam, archiver)
             elif method == "upload":
-                rgb_filename = input("Enter full image path: ").strip()
-                if not os.path.isfile(rgb_filename):
+                source = input("Enter full image path: ").strip()
+                if not os.path.isfile(source):
                     print("File not found. Try again.")
                     continue
             else:
                 print("Invalid input. Choose 'camera' or 'upload'.")
                 continue
 
-            # Step 3: Classify fruit
-            fruit, quality = classify_and_log(rgb_filename)
-            print(f"Identified: {fruit}, Quality: {quality}")
-
-            # Step 3.1: Update and check counters
-            key = f"{fruit}_{quality}"
-            if key in counters:
-                counters[key] += 1
-                print(f"Counter [{key}]: {counters[key]} / {thresholds[key]}")
-                if counters[key] >= thresholds[key]:
-                    print(f"Move {quality} {fruit} conveyor by 1")
-                    counters[key] = 0
-
-            # Step 4: Move to pick and close gripper
-            phiCmd = move_to_position(myArm, myArmUtilities, np.array(positions["Pick_pose"]), gamma, gripCmd, led_cmd, "PICK")
-            if phiCmd is None: break
+            # Step 3: Classify fruit and update counters
+            fruit, quality = classify(source)
+            update_counters(counters, fruit, quality)
 
-            gripCmd = 1.0
-            myArm.read_write_std(phiCMD=phiCmd, gprCMD=gripCmd, baseLED=led_cmd)
-            print("Gripper closed at PICK position.")
-            time.sleep(1)
-
-            # Step 5: Decide destination
-            destination_key = ""
-            if quality == "ripe":
-                if fruit == "banana":
-                    destination_key = "R_ban"
-                elif fruit == "tomato":
-                    destination_key = "R_tom"
-                elif fruit == "strawberry":
-                    destination_key = "R_str"
-            elif quality == "unripe":
-                if fruit == "banana":
-                    destination_key = "U_ban"
-                elif fruit == "tomato":
-                    destination_key = "U_tom"
-                elif fruit == "strawberry":
-                    destination_key = "U_str"
-            elif quality == "rotten":
-                destination_key = "Rott"
-            else:
+            # Step 4: Decide destination
+            destination_key = destination_for(fruit, quality)
+            if destination_key is None:
                 print("Unknown classification result.")
                 break
 
+            # Step 5: Move to the fruit and close gripper
+            target, gamma = locate_fruit(source, depth, fruit, calibration) if depth is not None else (None, 0.0)
+            pick(myArm, registry, led_cmd, target, gamma)
+            if not first_pick_reported:
+                print(f"Time to first pick: {time.perf_counter() - launch_time:.1f} s")
+                first_pick_reported = True
+
             # Step 6: Move to destination and release
-            if destination_key in positions:
-                phiCmd = move_to_position(myArm, myArmUtilities, np.array(positions[destination_key]), gamma, gripCmd, led_cmd, f"PLACE - {destination_key}")
-                if phiCmd is None: break
-
-                gripCmd = 0.0
-                myArm.read_write_std(phiCMD=phiCmd, gprCMD=gripCmd, baseLED=led_cmd)
-                print("Gripper opened to place item.")
-                time.sleep(1)
-            else:
-                print("No matching destination. Skipping place.")
-                break
+            place(myArm, registry, destination_key, led_cmd)
 
             # Step 7: Return to home
-            phiCmd = move_to_position(myArm, myArmUtilities, np.array(positions["home"]), gamma, gripCmd, led_cmd, "HOME")
-            if phiCmd is None: break
+            go_home(myArm, registry, 0.0, led_cmd)
 
             # Step 8: Ask user to continue or not
             user_input = input("\nContinue to next fruit? (yes/no): ").strip().lower()
@@ -163,8 +285,235 @@ def main():
                 print("Terminating after this cycle.")
                 break
 
-    cv2.destroyAllWindows()
+    if archiver is not None:
+        archiver.close()
+    try:
+        cv2.destroyAllWindows()
+    except cv2.error:
+        pass  # headless OpenCV (sim/CI): there are no windows to close
+    print_move_summary()
+    print("Program ended.")
+
+# === Pipelined mode ===
+# A vision thread captures and classifies fruit N+1 while the motion thread is
+# placing fruit N. Hand-off points:
+#   pick_area_clear - set by motion once fruit N is grasped, so the camera only
+#                     looks at the pick area after it has been emptied
+#   jobs            - queue of classified fruit; motion blocks on it, so the
+#                     arm never picks before a classification is ready
+# The camera must see the pick area while the arm is away from it.
+def _put_job(jobs, job, stop):
+    # Blocking put that gives up once the motion stage has stopped
+    while True:
+        try:
+            jobs.put(job, timeout=0.1)
+            return True
+        except queue.Full:
+            if stop.is_set():
+                return False
+
+def vision_stage(myCam, jobs, pick_area_clear, stop, image_paths=None, max_fruits=None, feed_delay=0.0, archiver=None,
+                 calibration=None):
+    sources = iter(image_paths) if image_paths is not None else None
+    fruits_seen = 0
+    try:
+        while not stop.is_set() and (max_fruits is None or fruits_seen < max_fruits):
+            pick_area_clear.wait()
+            if stop.is_set():
+                break
+            pick_area_clear.clear()
+            time.sleep(feed_delay)  # Let the next fruit arrive in the pick area
+
+            depth = None
+            if sources is not None:
+                source = next(sources, None)
+                if source is None:
+                    break
+            else:
+                source, depth = capture_rgbd(myCam, archiver)
+
+            fruit, quality = classify(source)
+            target, gamma = locate_fruit(source, depth, fruit, calibration) if depth is not None else (None, 0.0)
+            if not _put_job(jobs, (fruit, quality, target, gamma), stop):
+                break
+            fruits_seen += 1
+    finally:
+        _put_job(jobs, None, stop)
+
+def motion_stage(myArm, registry, jobs, pick_area_clear, stop, led_cmd, counters, on_first_pick=None):
+    done = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            fruit, quality, target, gamma = job
+            update_counters(counters, fruit, quality)
+            destination_key = destination_for(fruit, quality)
+            if destination_key is None:
+                print("Unknown classification result.")
+                break
+
+            pick(myArm, registry, led_cmd, target, gamma)
+            if on_first_pick is not None and done == 0:
+                on_first_pick()
+            # Fruit is in the gripper: the vision stage may look at the next one
+            pick_area_clear.set()
+
+            place(myArm, registry, destination_key, led_cmd)
+            go_home(myArm, registry, 0.0, led_cmd)
+
+            done += 1
+            elapsed = time.perf_counter() - start
+            print(f"Sorted {done} fruit, {60.0 * done / elapsed:.1f} fruit/min")
+    finally:
+        stop.set()
+        pick_area_clear.set()
+    return done, time.perf_counter() - start
+
+def main_pipelined(image_paths=None, max_fruits=None, feed_delay=0.0, archive_dir=None):
+    launch_time = time.perf_counter()
+    start_loading()
+    get_logger()  # open the log database before the arm moves
+
+    led_cmd = np.array([0, 1, 0], dtype=np.float64)
+    np.set_printoptions(precision=2, suppress=True)
+
+    print("--- Full Auto (pipelined): Capture/Classify || Pick → Sort ---\n")
+
+    counters = new_counters()
+    jobs = queue.Queue(maxsize=1)
+    pick_area_clear = threading.Event()
+    stop = threading.Event()
+    registry = load_registry()
+    archiver = open_archiver(archive_dir)
+    # The next fruit is captured while the arm is still placing or returning, and
+    # T_base_cam only holds with the wrist camera at home: pick at Pick_pose instead
+    calibration = None
+    if use_depth_pick:
+        print("Pipelined mode picks at Pick_pose (depth picking needs the camera at home).")
+
+    with QArm(hardware=0) as myArm, open_camera() as myCam:
+        instrument_devices(myArm, myCam)
+        go_home(myArm, registry, 0.0, led_cmd)
+        pick_area_clear.set()
+
+        vision = threading.Thread(
+            target=vision_stage, name="Vision", daemon=True,
+            args=(myCam, jobs, pick_area_clear, stop, image_paths, max_fruits, feed_delay, archiver, calibration)
+        )
+        vision.start()
+        try:
+            done, elapsed = motion_stage(
+                myArm, registry, jobs, pick_area_clear, stop, led_cmd, counters,
+                on_first_pick=lambda: print(f"Time to first pick: {time.perf_counter() - launch_time:.1f} s")
+            )
+        except KeyboardInterrupt:
+            print("Interrupted, stopping pipeline.")
+            stop.set()
+            pick_area_clear.set()
+            done, elapsed = 0, 0.0
+        vision.join(timeout=5.0)
+
+    if archiver is not None:
+        archiver.close()
+    if done:
+        print(f"Sorted {done} fruit in {elapsed:.1f} s ({60.0 * done / elapsed:.1f} fruit/min)")
+    print_move_summary()
+    print("Program ended.")
+
+# === Tray mode ===
+# One capture and one batched classification per tray of several fruit. Fruit
+# are then picked in the order that minimises arm travel between pick points and
+# bins, going home only once the tray is empty. Needs depth to locate each fruit.
+def main_tray(archive_dir=None):
+    start_loading()
+    get_logger()  # open the log database before the arm moves
+    led_cmd = np.array([0, 1, 0], dtype=np.float64)
+    np.set_printoptions(precision=2, suppress=True)
+
+    print("--- Full Auto (tray): Capture → Classify all → Plan → Pick/Sort each ---\n")
+
+    calibration = load_calibration()
+    if calibration is None:
+        print("Tray mode needs the camera calibration to locate each fruit.")
+        return
+
+    counters = new_counters()
+    registry = load_registry()
+    archiver = open_archiver(archive_dir)
+    done = 0
+    start = time.perf_counter()
+
+    with QArm(hardware=0) as myArm, open_camera() as myCam:
+        instrument_devices(myArm, myCam)
+
+        while True:
+            go_home(myArm, registry, 0.0, led_cmd)
+
+            frame, depth = capture_rgbd(myCam, archiver)
+            with timer("tray_vision_seconds", "Segment + batch classify + locate a tray"):
+                fruits = find_fruits(frame, depth, calibration, use_grasp_angle)
+            print(f"Found {len(fruits)} fruit on the tray.")
+
+            jobs = []
+            for fruit in fruits:
+                get_logger().log(fruit.fruit, fruit.quality, fruit.confidence)
+                count("classified_total", help_text="Fruit classified")
+                destination_key = destination_for(fruit.fruit, fruit.quality)
+                print(f"Identified: {fruit.fruit}, Quality: {fruit.quality} ({fruit.confidence:.2f}) at {fruit.bbox}")
+                if destination_key is None or fruit.target is None or solve_pick(myArm, fruit.target, fruit.gamma) is None:
+                    print("  -> cannot pick this one, leaving it on the tray.")
+                    continue
+                jobs.append((fruit, destination_key))
+
+            order = plan_pick_order([f.target for f, _ in jobs],
+                                    [positions[key] for _, key in jobs], positions["home"])
+            for i in order:
+                fruit, destination_key = jobs[i]
+                update_counters(counters, fruit.fruit, fruit.quality)
+                pick(myArm, registry, led_cmd, fruit.target, fruit.gamma)
+                place(myArm, registry, destination_key, led_cmd)
+                done += 1
+
+            go_home(myArm, registry, 0.0, led_cmd)
+            elapsed = time.perf_counter() - start
+            if done:
+                print(f"Sorted {done} fruit, {60.0 * done / elapsed:.1f} fruit/min")
+
+            user_input = input("\nNext tray? (yes/no): ").strip().lower()
+            if user_input != "yes":
+                print("Terminating after this tray.")
+                break
+
+    if archiver is not None:
+        archiver.close()
+    print_move_summary()
     print("Program ended.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Fully automatic fruit sorter")
+    parser.add_argument("--pipelined", action="store_true", help="classify the next fruit while the arm sorts the current one")
+    parser.add_argument("--images", nargs="+", help="pipelined mode: classify these files instead of the camera")
+    parser.add_argument("--max-fruits", type=int, default=None, help="pipelined mode: stop after this many fruit")
+    parser.add_argument("--archive-frames", metavar="DIR", default=None, help="save camera frames to DIR in the background")
+    parser.add_argument("--stream", action="store_true", help="stream velocity/acceleration-limited trajectories for each move")
+    parser.add_argument("--metrics-port", type=int, default=None, help="serve Prometheus metrics on localhost:PORT/metrics")
+    parser.add_argument("--metrics-file", default=None, help="write Prometheus metrics to this file every few seconds")
+    parser.add_argument("--feed-delay", type=float, default=0.0, help="pipelined mode: seconds for the next fruit to arrive")
+    parser.add_argument("--tray", action="store_true", help="several fruit per image: classify them all at once and plan the pick order")
+    parser.add_argument("--fixed-pick", action="store_true", help="always pick at Pick_pose (ignore depth)")
+    parser.add_argument("--no-grasp-angle", action="store_true", help="always pick with the wrist at gamma = 0")
+    args = parser.parse_args()
+    stream_moves = args.stream
+    use_depth_pick = not args.fixed_pick
+    use_grasp_angle = not args.no_grasp_angle
+    start_metrics(args.metrics_port, args.metrics_file)
+
+    if args.tray:
+        main_tray(args.archive_frames)
+    elif args.pipelined:
+        main_pipelined(args.images, args.max_fruits, args.feed_delay, args.archive_frames)
+    else:
+        main(args.archive_frames)
@@ -0,0 +1,284 @@
+# bench_full_auto.py
+# Reproducible benchmark of the Full_auto sort cycle. Drives capture -> classify
+# -> IK -> pick -> place -> home with scripted inputs (no input() prompts) on the
+# simulated backend by default, and reports startup time, throughput and
+# p50/p95/p99 latency per stage. Results are written as JSON (with the git
+# commit) so runs can be compared across commits with --compare.
+#
+#   python bench_full_auto.py --cycles 20 --images "Center_line/Test data" --out bench.json
+#   python bench_full_auto.py --micro --out micro.json --compare bench_old.json
+
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import numpy as np
+
+# Simulator unless the caller explicitly asks for hardware
+os.environ.setdefault("QARM_BACKEND", "sim")
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(here, "Center_line"))
+default_images = os.path.join(here, "Center_line", "Test data")
+
+import Full_auto
+import fruit_ident
+import data_logger
+
+def percentiles(samples):
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.size == 0:
+        return {}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "count": int(samples.size), "mean_s": float(samples.mean()),
+        "p50_s": float(p50), "p95_s": float(p95), "p99_s": float(p99), "max_s": float(samples.max())
+    }
+
+class StageTimes:
+    def __init__(self):
+        self.samples = {}
+
+    def time(self, stage, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.samples.setdefault(stage, []).append(time.perf_counter() - start)
+        return result
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            return self.time(stage, fn, *args, **kwargs)
+        return timed
+
+    def summary(self):
+        return {stage: percentiles(values) for stage, values in self.samples.items()}
+
+def list_images(path):
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, name) for name in os.listdir(path)
+                      if name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')))
+    return [path]
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=here,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# === End-to-end cycle ===
+def bench_cycle(cycles, images, source, pipelined):
+    led_cmd = np.array([0, 1, 0], dtype=np.float64)
+    times = StageTimes()
+    launch = time.perf_counter()
+    fruit_ident.start_loading()
+
+    startup = {}
+    registry = times.time("startup_registry", Full_auto.load_registry)
+    if source == "camera" and images:
+        os.environ["QARM_SIM_IMAGES"] = images[0] if len(images) == 1 else os.path.dirname(images[0])
+
+    with Full_auto.QArm(hardware=0) as myArm, Full_auto.open_camera() as myCam:
+        startup["hardware_open_s"] = time.perf_counter() - launch
+        Full_auto.go_home(myArm, registry, 0.0, led_cmd)
+        startup["first_home_s"] = time.perf_counter() - launch
+        fruit_ident.get_model()
+        startup["model_ready_s"] = time.perf_counter() - launch
+
+        if pipelined:
+            result = _bench_pipelined(myArm, myCam, registry, led_cmd, cycles, images, source, launch)
+            result["startup"].update(startup)
+            return result
+
+        counters = Full_auto.new_counters()
+        cycle_times = []
+        for i in range(cycles):
+            cycle_start = time.perf_counter()
+            if source == "camera":
+                frame = times.time("capture", Full_auto.capture_image, myCam)
+            else:
+                frame = images[i % len(images)]
+            fruit, quality = times.time("classify", Full_auto.classify, frame)
+            Full_auto.update_counters(counters, fruit, quality)
+            destination_key = Full_auto.destination_for(fruit, quality)
+            # The cycle reads joints from the pose registry; this times the IK solve it replaces
+            times.time("ik", _solve_ik, (Full_auto.positions["Pick_pose"], Full_auto.positions[destination_key]))
+            times.time("pick", Full_auto.pick, myArm, registry, led_cmd)
+            if i == 0:
+                startup["time_to_first_pick_s"] = time.perf_counter() - launch
+            times.time("place", Full_auto.place, myArm, registry, destination_key, led_cmd)
+            times.time("home", Full_auto.go_home, myArm, registry, 0.0, led_cmd)
+            cycle_times.append(time.perf_counter() - cycle_start)
+
+    total = float(np.sum(cycle_times))
+    stages = times.summary()
+    stages["cycle"] = percentiles(cycle_times)
+    return {
+        "startup": startup,
+        "stages": stages,
+        "throughput_fpm": 60.0 * cycles / total if total > 0 else None,
+    }
+
+def _solve_ik(targets):
+    for position in targets:
+        Full_auto.arm_utilities.qarm_inverse_kinematics(np.array(position, dtype=np.float64), 0, np.zeros(4))
+
+def _bench_pipelined(myArm, myCam, registry, led_cmd, cycles, images, source, launch):
+    jobs = queue.Queue(maxsize=1)
+    pick_area_clear = threading.Event()
+    stop = threading.Event()
+    pick_area_clear.set()
+    startup = {}
+    times = StageTimes()
+    cycle_ends = []
+
+    # The stages call these through the Full_auto module, so timed wrappers see every call
+    stages = {"capture_rgbd": "capture", "classify": "classify", "locate_fruit": "locate",
+              "pick": "pick", "place": "place", "go_home": "home"}
+    originals = {name: getattr(Full_auto, name) for name in stages}
+    for name, stage in stages.items():
+        setattr(Full_auto, name, times.wrap(stage, originals[name]))
+    home = Full_auto.go_home
+    Full_auto.go_home = lambda *args: (home(*args), cycle_ends.append(time.perf_counter()))[0]
+
+    paths = None if source == "camera" else [images[i % len(images)] for i in range(cycles)]
+    try:
+        vision = threading.Thread(target=Full_auto.vision_stage, daemon=True,
+                                  args=(myCam, jobs, pick_area_clear, stop, paths, cycles))
+        start = time.perf_counter()
+        vision.start()
+        done, elapsed = Full_auto.motion_stage(
+            myArm, registry, jobs, pick_area_clear, stop, led_cmd, Full_auto.new_counters(),
+            on_first_pick=lambda: startup.__setitem__("time_to_first_pick_s", time.perf_counter() - launch)
+        )
+        vision.join(timeout=5.0)
+    finally:
+        for name, fn in originals.items():
+            setattr(Full_auto, name, fn)
+
+    summary = times.summary()
+    # Time between fruit leaving home, i.e. the pipelined cycle time
+    summary["cycle"] = percentiles(np.diff([start] + cycle_ends))
+    return {
+        "startup": startup,
+        "stages": summary,
+        "throughput_fpm": 60.0 * done / elapsed if elapsed > 0 else None,
+    }
+
+# === Micro-benchmarks ===
+def bench_micro(images, repeats):
+    import cv2
+    from Center_of_mass import detect_fruit_bbox, compute_alignment
+
+    results = {}
+    fruit_ident.get_model()
+    results["classify_and_log"] = percentiles([
+        _timed(fruit_ident.classify_and_log, path) for _ in range(repeats) for path in images
+    ])
+    results["classify_batch"] = percentiles([
+        _timed(fruit_ident.classify_batch, images) / len(images) for _ in range(repeats)
+    ])
+
+    utilities = Full_auto.QArmUtilities()
+    targets = [np.array(p, dtype=np.float64) for p in Full_auto.positions.values()]
+    results["inverse_kinematics"] = percentiles([
+        _timed(utilities.qarm_inverse_kinematics, p, 0, np.zeros(4)) for _ in range(repeats) for p in targets
+    ])
+
+    frames = [cv2.imread(path) for path in images]
+    results["center_of_mass"] = percentiles([
+        _timed(_orientation, frame, detect_fruit_bbox, compute_alignment)
+        for _ in range(repeats) for frame in frames if frame is not None
+    ])
+    return results
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+def _orientation(frame, detect_fruit_bbox, compute_alignment):
+    bbox = detect_fruit_bbox(frame, "banana")
+    if bbox is not None:
+        x, y, w, h = bbox
+        frame = frame[y:y + h, x:x + w]
+    return compute_alignment(frame)
+
+# === Reporting ===
+def print_report(results):
+    if "startup" in results:
+        print("\n--- Startup (s) ---")
+        for key, value in results["startup"].items():
+            print(f"{key:<24} {value:8.3f}")
+    for section in ("stages", "micro"):
+        if results.get(section):
+            print(f"\n--- {section} (ms): count, mean, p50, p95, p99 ---")
+            for name, s in results[section].items():
+                if s:
+                    print(f"{name:<24} {s['count']:5d} {1e3 * s['mean_s']:9.2f} {1e3 * s['p50_s']:9.2f} "
+                          f"{1e3 * s['p95_s']:9.2f} {1e3 * s['p99_s']:9.2f}")
+    if results.get("throughput_fpm"):
+        print(f"\nThroughput: {results['throughput_fpm']:.2f} fruit/min")
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\n--- p50 vs {baseline_path} ({baseline.get('meta', {}).get('commit')}) ---")
+    for section in ("stages", "micro"):
+        for name, s in results.get(section, {}).items():
+            old = baseline.get(section, {}).get(name)
+            if s and old:
+                print(f"{name:<24} {1e3 * old['p50_s']:9.2f} -> {1e3 * s['p50_s']:9.2f} ms "
+                      f"({s['p50_s'] / old['p50_s']:5.2f}x)")
+    if results.get("throughput_fpm") and baseline.get("throughput_fpm"):
+        print(f"{'throughput':<24} {baseline['throughput_fpm']:9.2f} -> {results['throughput_fpm']:9.2f} fruit/min")
+
+def main():
+    parser = argparse.ArgumentParser(description="Full_auto sort-cycle benchmark")
+    parser.add_argument("--cycles", type=int, default=10, help="sort cycles to run (0 to skip the cycle benchmark)")
+    parser.add_argument("--images", default=default_images, help="image file or directory used as scripted input")
+    parser.add_argument("--source", choices=["camera", "upload"], default="upload",
+                        help="camera: frames from the (simulated) RealSense; upload: image files")
+    parser.add_argument("--pipelined", action="store_true", help="benchmark the pipelined mode")
+    parser.add_argument("--micro", action="store_true", help="also run micro-benchmarks")
+    parser.add_argument("--repeats", type=int, default=5, help="micro-benchmark repetitions")
+    parser.add_argument("--model", default=None, help="override the model path")
+    parser.add_argument("--out", default="bench_results.json", help="JSON output path")
+    parser.add_argument("--compare", default=None, help="previous results JSON to compare against")
+    args = parser.parse_args()
+
+    if args.model:
+        fruit_ident.model_path = args.model
+    # Keep benchmark rows out of the production log
+    log_dir = tempfile.mkdtemp(prefix="bench_log_")
+    data_logger.db_path = os.path.join(log_dir, "bench.sqlite")
+    data_logger.excel_path = os.path.join(log_dir, "none.xlsx")
+
+    images = list_images(args.images)
+    results = {
+        "meta": {
+            "commit": git_commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "backend": os.environ.get("QARM_BACKEND"), "python": platform.python_version(),
+            "platform": platform.platform(), "args": vars(args)
+        }
+    }
+    if args.cycles > 0:
+        results.update(bench_cycle(args.cycles, images, args.source, args.pipelined))
+    if args.micro:
+        results["micro"] = bench_micro(images, args.repeats)
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print_report(results)
+    if args.compare:
+        compare(results, args.compare)
+    print(f"\nResults written to {args.out}")
+
+if __name__ == "__main__":
+    main()
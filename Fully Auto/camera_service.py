@@ -0,0 +1,187 @@
+# camera_service.py
+# Background RealSense acquisition. A thread reads RGB and depth (in metres,
+# read_depth(dataMode='M')) in readMode=1 and copies each frame into a pre-allocated ring buffer slot together with its
+# sequence number and timestamp, so consumers never block on the sensor:
+#
+#   with CameraService(open_realsense()) as camera:
+#       frame = camera.latest()               # newest RGB, no waiting
+#       rgb, depth = camera.latest_pair()     # newest RGB + closest-in-time depth
+#       rgb, depth = camera.capture()         # first pair acquired after this call
+#
+# Returned images are views into the ring (no copy). A view stays valid until the
+# writer laps the ring (slots - 1 frame periods); frames returned by capture()
+# are pinned and stay valid until the same thread calls capture() again.
+
+import time
+import threading
+from collections import namedtuple
+import numpy as np
+
+Frame = namedtuple("Frame", ["seq", "timestamp", "image", "slot"])
+
+class _Ring:
+    def __init__(self, shape, dtype, slots):
+        self.images = np.zeros((slots, *shape), dtype=dtype)
+        self.stamps = np.full(slots, -np.inf)
+        self.seqs = np.full(slots, -1, dtype=np.int64)
+        self.pins = np.zeros(slots, dtype=np.int64)
+        self.newest = -1   # slot index of the newest complete frame
+        self.seq = -1
+        self.dropped = 0
+
+    def write_slot(self):
+        # Next slot after the newest that nobody has pinned (None if all are)
+        slots = len(self.seqs)
+        for step in range(1, slots + 1):
+            slot = (self.newest + step) % slots
+            if slot != self.newest and self.pins[slot] == 0:
+                return slot
+        return None
+
+    def frame(self, slot):
+        return Frame(int(self.seqs[slot]), float(self.stamps[slot]), self.images[slot], slot)
+
+class CameraService:
+    def __init__(self, camera, slots=4, depth=True, max_skew=0.02):
+        # camera: an open QArmRealSense (readMode=1) or SimQArmRealSense
+        self.camera = camera
+        self.depth = depth
+        self.max_skew = max_skew
+        self._rgb = _Ring(camera.imageBufferRGB.shape, camera.imageBufferRGB.dtype, slots)
+        # Depth frames are stored as (H, W) float32 metres, without the buffer's channel axis
+        self._depth = _Ring(camera.imageBufferDepthM.shape[:2], np.float32, slots) if depth else None
+        self._cond = threading.Condition()
+        self._held = threading.local()
+        self._stop = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="CameraService", daemon=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        if not self._thread.is_alive():
+            self._thread.start()
+        return self
+
+    def close(self, timeout=2.0):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        self.camera.terminate()
+        dropped = self._rgb.dropped + (self._depth.dropped if self._depth else 0)
+        if dropped:
+            print(f"Camera service dropped {dropped} frames (all slots pinned).")
+
+    # === Acquisition thread ===
+    def _acquire(self, read, buffer, ring):
+        # read() returns the sensor timestamp, or a negative value when there is no new frame
+        stamp = read()
+        if stamp is not None and stamp < 0:
+            return False
+        now = time.perf_counter()
+        with self._cond:
+            slot = ring.write_slot()
+        if slot is None:
+            ring.dropped += 1
+            return True
+        np.copyto(ring.images[slot], buffer.reshape(ring.images.shape[1:]))
+        with self._cond:
+            ring.seq += 1
+            ring.seqs[slot] = ring.seq
+            ring.stamps[slot] = now
+            ring.newest = slot
+            self._cond.notify_all()
+        return True
+
+    def _run(self):
+        camera = self.camera
+        try:
+            while not self._stop.is_set():
+                got = self._acquire(camera.read_RGB, camera.imageBufferRGB, self._rgb)
+                if self._depth is not None:
+                    got |= self._acquire(lambda: camera.read_depth(dataMode='M'), camera.imageBufferDepthM, self._depth)
+                if not got:
+                    time.sleep(0.001)
+        except Exception as e:
+            self._error = e
+            print(f"Camera acquisition stopped: {e}")
+            with self._cond:
+                self._cond.notify_all()
+
+    # === Consumers ===
+    @property
+    def sequence(self):
+        return self._rgb.seq
+
+    def latest(self):
+        # Newest RGB frame, or None before the first one arrives
+        with self._cond:
+            if self._rgb.newest < 0:
+                return None
+            return self._rgb.frame(self._rgb.newest)
+
+    def latest_depth(self):
+        with self._cond:
+            if self._depth is None or self._depth.newest < 0:
+                return None
+            return self._depth.frame(self._depth.newest)
+
+    def _pair(self):
+        # Newest RGB and the depth frame closest to it in time (caller holds the lock)
+        if self._rgb.newest < 0:
+            return None
+        rgb = self._rgb.frame(self._rgb.newest)
+        if self._depth is None:
+            return rgb, None
+        slot = int(np.argmin(np.abs(self._depth.stamps - rgb.timestamp)))
+        if self._depth.seqs[slot] < 0 or abs(self._depth.stamps[slot] - rgb.timestamp) > self.max_skew:
+            return None
+        return rgb, self._depth.frame(slot)
+
+    def latest_pair(self):
+        # (rgb Frame, depth Frame) time-aligned within max_skew, or None
+        with self._cond:
+            return self._pair()
+
+    def capture(self, timeout=2.0):
+        # Waits for the first aligned pair acquired after this call and pins it for
+        # this thread until its next capture(). Returns (rgb Frame, depth Frame or None).
+        after = time.perf_counter()
+        deadline = after + timeout
+        with self._cond:
+            while True:
+                if self._error is not None:
+                    raise RuntimeError("Camera acquisition stopped") from self._error
+                pair = self._pair()
+                if pair is not None and pair[0].timestamp > after:
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise TimeoutError("No new camera frame")
+                self._cond.wait(remaining)
+            self._release_held()
+            rgb, depth = pair
+            self._rgb.pins[rgb.slot] += 1
+            if depth is not None:
+                self._depth.pins[depth.slot] += 1
+            self._held.pair = pair
+        return pair
+
+    def _release_held(self):
+        pair = getattr(self._held, "pair", None)
+        if pair is None:
+            return
+        rgb, depth = pair
+        self._rgb.pins[rgb.slot] -= 1
+        if depth is not None:
+            self._depth.pins[depth.slot] -= 1
+        self._held.pair = None
+
+    def release(self):
+        # Unpin this thread's last capture() early
+        with self._cond:
+            self._release_held()
@@ -0,0 +1,207 @@
+# data_logger.py
+# Background logger for classification results. Rows are queued on the hot path
+# and written in batches to an append-only SQLite (WAL) database by a writer
+# thread. The Excel sheet is only produced on demand with export_excel().
+
+import os
+import sys
+import time
+import queue
+import sqlite3
+import atexit
+import threading
+from datetime import datetime
+from instrumentation import timer, count
+
+# === Paths ===
+log_dir = r"C:\Users\hitis\Desktop\Applied Robotics\Report\Codes\Fully Auto"
+db_path = os.path.join(log_dir, "Data logger.sqlite")
+excel_path = os.path.join(log_dir, "Data logger.xlsx")
+
+columns = ["Fruit", "Quality", "Date", "Time", "Confidence"]
+
+_STOP = object()
+
+class DataLogger:
+    def __init__(self, path=db_path, max_queue=10000, flush_rows=50, flush_interval=2.0):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.error = None   # set if the writer thread dies
+        self._warned = False
+        # Open the database once here so a bad path fails before the first sort cycle
+        self._connect().close()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="DataLogger", daemon=True)
+        self._thread.start()
+
+    def _check_writer(self):
+        if self.error is not None:
+            raise RuntimeError(f"Data logger writer stopped, nothing is being saved to {self.path}") from self.error
+
+    def _drop(self, reason):
+        self.dropped += 1
+        count("log_rows_dropped_total", help_text="Log rows dropped (queue full or writer stopped)")
+        if not self._warned:
+            print(f"Warning: data logger is dropping rows ({reason})")
+            self._warned = True
+        return False
+
+    # === Hot path: constant time, never touches the disk or raises ===
+    def log(self, fruit, quality, confidence=None, when=None):
+        # A dead writer must not stop the arm mid-cycle; close() reports the error
+        if self.error is not None or not self._thread.is_alive():
+            return self._drop("writer stopped")
+        with timer("log_enqueue_seconds", "Time to queue one log row"):
+            now = when or datetime.now()
+            row = (fruit, quality, now.strftime("%Y-%m-%d"), now.strftime("%H:%M:%S"), confidence)
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                return self._drop("queue full")
+        return True
+
+    def flush(self, timeout=None):
+        # Block until everything queued so far is committed; raises if the writer died
+        self._check_writer()
+        if not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(done)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not done.wait(0.1):
+            if not self._thread.is_alive():
+                self._check_writer()
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+        return True
+
+    def close(self, timeout=5.0):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        if self.dropped:
+            print(f"Data logger dropped {self.dropped} rows.")
+        self._check_writer()
+
+    # === Writer thread ===
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS log ("
+            "id INTEGER PRIMARY KEY, fruit TEXT, quality TEXT, date TEXT, time TEXT, confidence REAL)"
+        )
+        conn.commit()
+        return conn
+
+    def _run(self):
+        try:
+            self._write_loop()
+        except Exception as e:
+            self.error = e
+            print(f"Data logger stopped, rows are no longer saved: {e}")
+
+    def _write_loop(self):
+        conn = self._connect()
+        if conn.execute("SELECT COUNT(*) FROM log").fetchone()[0] == 0:
+            self._import_excel(conn)
+
+        pending = []
+        waiters = []
+        deadline = time.monotonic() + self.flush_interval
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.0))
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                running = False
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+            elif item is not None:
+                pending.append(item)
+
+            if not running or waiters or len(pending) >= self.flush_rows or time.monotonic() >= deadline:
+                if pending:
+                    with timer("log_flush_seconds", "Background batch insert + commit"):
+                        conn.executemany(
+                            "INSERT INTO log (fruit, quality, date, time, confidence) VALUES (?, ?, ?, ?, ?)",
+                            pending,
+                        )
+                        conn.commit()
+                    count("log_rows_written_total", len(pending), "Log rows committed")
+                    pending = []
+                for event in waiters:
+                    event.set()
+                waiters = []
+                deadline = time.monotonic() + self.flush_interval
+        conn.close()
+
+    def _import_excel(self, conn):
+        # One-off migration of the rows logged by the old workbook-based logger
+        if not os.path.isfile(excel_path):
+            return
+        import openpyxl
+        try:
+            wb = openpyxl.load_workbook(excel_path, read_only=True)
+        except Exception as e:
+            print(f"Could not import existing Excel log: {e}")
+            return
+        rows = [
+            (row[0], row[1], str(row[2]), str(row[3]), row[4] if len(row) > 4 else None)
+            for row in wb.active.iter_rows(min_row=2, values_only=True)
+            if row and row[0] is not None
+        ]
+        wb.close()
+        conn.executemany(
+            "INSERT INTO log (fruit, quality, date, time, confidence) VALUES (?, ?, ?, ?, ?)", rows
+        )
+        conn.commit()
+        print(f"Imported {len(rows)} rows from {excel_path}")
+
+    # === On-demand export ===
+    def export_excel(self, path=excel_path):
+        self.flush()
+        return export_excel(self.path, path)
+
+def export_excel(source=db_path, path=excel_path):
+    import openpyxl
+    conn = sqlite3.connect(source)
+    # Nothing has been logged yet if the writer never created the table
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'log'").fetchone():
+        rows = conn.execute("SELECT fruit, quality, date, time, confidence FROM log ORDER BY id")
+    else:
+        rows = []
+    wb = openpyxl.Workbook(write_only=True)
+    sheet = wb.create_sheet()
+    sheet.append(columns)
+    count = 0
+    for row in rows:
+        sheet.append(row)
+        count += 1
+    conn.close()
+    wb.save(path)
+    print(f"Exported {count} rows to {path}")
+    return count
+
+# === Shared instance ===
+_logger = None
+_logger_lock = threading.Lock()
+
+def get_logger():
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            _logger = DataLogger(db_path)
+            atexit.register(_logger.close)
+    return _logger
+
+if __name__ == "__main__":
+    # python data_logger.py [output.xlsx]
+    export_excel(db_path, sys.argv[1] if len(sys.argv) > 1 else excel_path)
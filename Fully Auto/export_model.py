@@ -0,0 +1,75 @@
+# export_model.py
+# Exports best_model.keras to TFLite for faster CPU inference:
+#   dynamic  - weights stored as int8, activations in float (no calibration data needed)
+#   int8     - weights and activations int8, calibrated on real images (--calibration-dir)
+#   float16  - weights stored as float16
+# Files are written next to the model as best_model_<mode>.tflite. FRUIT_IDENT_BACKEND=tflite
+# runs best_model_dynamic.tflite; pick another with FRUIT_IDENT_TFLITE=...\best_model_int8.tflite
+# after comparing them with TestML/benchmark_backends.py.
+# Calibrate int8 on images that are not in the benchmark dataset, otherwise the
+# benchmark overstates its accuracy.
+
+import os
+import argparse
+from pathlib import Path
+import numpy as np
+
+import fruit_ident
+
+modes = ("dynamic", "int8", "float16")
+
+def tflite_path(mode, model_path=fruit_ident.model_path):
+    return os.path.splitext(model_path)[0] + f"_{mode}.tflite"
+
+def calibration_images(folder, limit=300, seed=0):
+    # Random sample across all class sub-folders so every class shapes the activation ranges
+    paths = sorted(p for p in Path(folder).rglob("*") if p.suffix.lower() in (".png", ".jpg", ".jpeg"))
+    if not paths:
+        raise FileNotFoundError(f"No calibration images under {folder}")
+    rng = np.random.default_rng(seed)
+    return [paths[i] for i in rng.permutation(len(paths))[:limit]]
+
+def export(model, mode, out_path, calibration=None):
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == "int8":
+        def representative_dataset():
+            for path in calibration:
+                # Same preprocessing as fruit_ident at runtime
+                yield [fruit_ident.load_file(path)[None]]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        # Input/output stay float32, so callers don't change
+    with open(out_path, "wb") as f:
+        f.write(converter.convert())
+    print(f"{mode:<8} -> {out_path} ({os.path.getsize(out_path) / 1e6:.1f} MB)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the fruit model to quantised TFLite")
+    parser.add_argument("--model", default=fruit_ident.model_path)
+    parser.add_argument("--mode", choices=modes + ("all",), default="all")
+    parser.add_argument("--calibration-dir", default=None, help="images for int8 calibration, kept apart from the evaluation dataset")
+    parser.add_argument("--calibration-images", type=int, default=300)
+    args = parser.parse_args()
+
+    selected = modes if args.mode == "all" else (args.mode,)
+    if "int8" in selected and args.calibration_dir is None:
+        if args.mode == "int8":
+            parser.error("int8 needs --calibration-dir")
+        print("Skipping int8 (no --calibration-dir given)")
+        selected = tuple(m for m in selected if m != "int8")
+    calibration = calibration_images(args.calibration_dir, args.calibration_images) if "int8" in selected else None
+
+    # Conversion needs the Keras model itself, whatever backend is configured
+    fruit_ident.backend = "local"
+    fruit_ident.model_path = args.model
+    model = fruit_ident.get_model()
+    print(f"Keras model: {os.path.getsize(args.model) / 1e6:.1f} MB")
+    for mode in selected:
+        export(model, mode, tflite_path(mode, args.model), calibration)
+
+if __name__ == "__main__":
+    main()
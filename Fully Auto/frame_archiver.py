@@ -0,0 +1,49 @@
+# frame_archiver.py
+# Optional, asynchronous archiving of camera frames. save() copies the frame and
+# queues it; PNG encoding and the disk write happen on a background thread so
+# they never sit in the sort cycle.
+
+import os
+import time
+import queue
+import threading
+import cv2
+
+_STOP = object()
+
+class FrameArchiver:
+    def __init__(self, directory, prefix="rgb", max_queue=8):
+        self.directory = directory
+        self.prefix = prefix
+        self.dropped = 0
+        os.makedirs(directory, exist_ok=True)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="FrameArchiver", daemon=True)
+        self._thread.start()
+
+    def save(self, frame):
+        # The camera reuses its buffer, so keep our own copy
+        stamp = time.strftime("%Y%m%d-%H%M%S") + f"-{int(time.time() * 1000) % 1000:03d}"
+        try:
+            self._queue.put_nowait((stamp, frame.copy()))
+        except queue.Full:
+            self.dropped += 1
+            return None
+        return os.path.join(self.directory, f"{self.prefix}_{stamp}.png")
+
+    def close(self, timeout=5.0):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        if self.dropped:
+            print(f"Frame archiver dropped {self.dropped} frames (queue full).")
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            stamp, frame = item
+            path = os.path.join(self.directory, f"{self.prefix}_{stamp}.png")
+            if not cv2.imwrite(path, frame):
+                print(f"Could not write frame to {path}")
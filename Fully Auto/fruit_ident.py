@@ -1,14 +1,30 @@
 # fruit_ident.py
 
+import os
+import time
+import threading
 import numpy as np
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
-import openpyxl
-from datetime import datetime
+import cv2
+from PIL import Image
+from data_logger import get_logger
+from instrumentation import timer
+from preprocess_cache import default_cache
 
-# === Load Model Only Once ===
+# === Model (loaded once, lazily, on a background thread) ===
 model_path = r"C:\Users\hitis\Desktop\Applied Robotics\Report\Codes\Fully Auto\best_model.keras"
-model = load_model(model_path)
+model = None
+_model_ready = threading.Event()
+_model_error = None
+_loader = None
+_loader_lock = threading.Lock()
+
+# === Backend ===
+# "local" loads the Keras model in this process; "server" sends batches to
+# inference_server.py, which keeps one model loaded for every script; "tflite"
+# runs a quantised export from export_model.py (FRUIT_IDENT_TFLITE picks the file;
+# the default is the dynamic-range export, which export_model.py always writes)
+backend = os.environ.get("FRUIT_IDENT_BACKEND", "local").lower()
+tflite_path = os.environ.get("FRUIT_IDENT_TFLITE", os.path.splitext(model_path)[0] + "_dynamic.tflite")
 
 # === Class Labels ===
 class_labels = [
@@ -17,29 +33,128 @@ class_labels = [
     'tomato_ripe', 'tomato_rotten', 'tomato_unripe'
 ]
 
-def classify_and_log(img_path):
-    # === Preprocess Image ===
-    img = image.load_img(img_path, target_size=(224, 224))
-    img_array = image.img_to_array(img) / 255.0
-    img_array = np.expand_dims(img_array, axis=0)
-
-    # === Predict ===
-    predictions = model.predict(img_array)
-    class_index = np.argmax(predictions)
-    predicted_class = class_labels[class_index]
-    fruit, quality = predicted_class.split('_')
-
-    # === Log to Excel ===
-    excel_path = r"C:\Users\hitis\Desktop\Applied Robotics\Report\Codes\Fully Auto\Data logger.xlsx"
-    wb = openpyxl.load_workbook(excel_path)
-    sheet = wb.active
-    next_row = sheet.max_row + 1
-    now = datetime.now()
-    sheet.cell(row=next_row, column=1).value = fruit
-    sheet.cell(row=next_row, column=2).value = quality
-    sheet.cell(row=next_row, column=3).value = now.strftime("%Y-%m-%d")
-    sheet.cell(row=next_row, column=4).value = now.strftime("%H:%M:%S")
-    wb.save(excel_path)
-
-    print(f"Logged: {fruit}, {quality}, {now.strftime('%Y-%m-%d')}, {now.strftime('%H:%M:%S')}")
+# === Input Settings ===
+target_size = (224, 224)
+default_batch_size = 16
+
+def _connect_server():
+    # Returns an InferenceClient, or None to fall back to loading the model here
+    from inference_server import InferenceClient
+    try:
+        client = InferenceClient()
+    except OSError as e:
+        print(f"Inference server not reachable ({e}), loading the model locally.")
+        return None
+    if os.path.normcase(os.path.abspath(client.model_path)) != os.path.normcase(os.path.abspath(model_path)):
+        print(f"Inference server is serving {client.model_path}, loading {model_path} locally.")
+        client.close()
+        return None
+    print(f"Using the inference server at {client.address}")
+    return client
+
+def _load_model():
+    global model, _model_error
+    try:
+        if backend == "server":
+            client = _connect_server()
+            if client is not None:
+                model = client
+                return
+        t0 = time.perf_counter()
+        if backend == "tflite":
+            from tflite_backend import TFLiteModel
+            loaded = TFLiteModel(tflite_path)
+        else:
+            # TensorFlow is imported here so that importing this module stays cheap
+            from tensorflow.keras.models import load_model
+            loaded = load_model(model_path)
+        t1 = time.perf_counter()
+        # Warm-up pass so the first real fruit doesn't pay for graph tracing
+        loaded.predict_on_batch(np.zeros((1, *target_size, 3), dtype=np.float32))
+        model = loaded
+        print(f"Model loaded in {t1 - t0:.1f} s, warmed up in {time.perf_counter() - t1:.1f} s")
+    except Exception as e:
+        _model_error = e
+        print(f"Model failed to load: {e}")
+    finally:
+        _model_ready.set()
+
+def start_loading():
+    # Kick off model loading in the background; safe to call more than once
+    global _loader
+    with _loader_lock:
+        if _loader is None:
+            _loader = threading.Thread(target=_load_model, name="ModelLoader", daemon=True)
+            _loader.start()
+    return _loader
+
+def get_model(timeout=None):
+    start_loading()
+    if not _model_ready.wait(timeout):
+        raise TimeoutError("Model is still loading")
+    if _model_error is not None:
+        raise RuntimeError(f"Could not load model from {tflite_path if backend == 'tflite' else model_path}") from _model_error
+    return model
+
+def load_file(path):
+    # Same decode as keras' load_img: RGB, nearest-neighbour resize, then /255
+    with Image.open(path) as pil_img:
+        pil_img = pil_img.convert('RGB')
+        if pil_img.size != (target_size[1], target_size[0]):
+            pil_img = pil_img.resize((target_size[1], target_size[0]), Image.NEAREST)
+        x = np.asarray(pil_img, dtype=np.float32)
+    x /= 255.0
+    return x
+
+def preprocess_into(dest, img, bgr=False):
+    # Fill one slot of the input tensor from a file path or an in-memory image
+    if isinstance(img, (str, os.PathLike)):
+        # Re-classifying the same file reads the cached tensor instead of decoding again
+        cache = default_cache()
+        params = {"size": target_size, "resize": "nearest", "dtype": "float32", "scale": "1/255"}
+        dest[...] = cache.get(img, params, load_file) if cache is not None else load_file(img)
+        return
+    img = np.asarray(img)
+    if img.shape[:2] != target_size:
+        # Nearest neighbour, same as load_img; resize first so the colour conversion runs on 224x224
+        img = cv2.resize(img, (target_size[1], target_size[0]), interpolation=cv2.INTER_NEAREST)
+    if bgr:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    dest[...] = img
+    dest /= 255.0
+
+def decode_prediction(pred):
+    class_index = int(np.argmax(pred))
+    fruit, quality = class_labels[class_index].split('_')
+    return fruit, quality, float(pred[class_index])
+
+def classify_batch(images, batch_size=default_batch_size, bgr=False):
+    # === Classify many file paths / arrays, one forward pass per batch ===
+    # Arrays are RGB unless bgr=True (OpenCV / RealSense buffers)
+    images = list(images)
+    if not images:
+        return []
+    model = get_model()
+
+    # Input tensor is allocated once and reused for every batch
+    batch = np.empty((min(batch_size, len(images)), *target_size, 3), dtype=np.float32)
+    results = []
+    for start in range(0, len(images), batch_size):
+        chunk = images[start:start + batch_size]
+        with timer("preprocess_seconds", "Image decode/resize/normalise per batch"):
+            for i, img in enumerate(chunk):
+                preprocess_into(batch[i], img, bgr)
+        with timer("predict_seconds", "Model forward pass per batch"):
+            predictions = np.asarray(model.predict_on_batch(batch[:len(chunk)]))
+        results.extend(decode_prediction(pred) for pred in predictions)
+    return results
+
+def classify_and_log(img, bgr=False):
+    # === Preprocess Image & Predict ===
+    # img is a file path or an in-memory frame (no intermediate file needed)
+    fruit, quality, confidence = classify_batch([img], batch_size=1, bgr=bgr)[0]
+
+    # === Log (queued, written in the background) ===
+    get_logger().log(fruit, quality, confidence)
+    print(f"Logged: {fruit}, {quality} ({confidence:.2f})")
     return fruit, quality
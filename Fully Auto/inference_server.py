@@ -0,0 +1,317 @@
+# inference_server.py
+# Local inference service: loads best_model.keras once and serves every script
+# on this machine (Full_auto, the TestML scripts, ...), so they no longer import
+# TensorFlow or hold their own copy of the model.
+#
+#   python inference_server.py [--model best_model.keras] [--max-batch 32] [--max-wait-ms 5]
+#   FRUIT_IDENT_BACKEND=server python Full_auto.py
+#
+# Each client creates one shared-memory block (capacity x 224x224x3 float32) and
+# writes its preprocessed batch there; only small request/reply headers and the
+# probabilities go over the socket (a Unix socket, or loopback TCP where AF_UNIX
+# isn't available). Requests that arrive from several clients within max_wait
+# are run as one forward pass.
+#
+#   Request (client -> server): magic "QI", version, kind, request id, count
+#     HELLO  count = length of the shared-memory name that follows
+#     INFER  count = images at the start of the client's shared memory
+#   Reply (server -> client): magic, version, status, request id, count, payload length
+#     HELLO  count = classes, payload = "<max batch>|<model path>"
+#     INFER  count = images, payload = count x classes float32 probabilities
+#     status ERROR: payload = message
+
+import os
+import time
+import queue
+import socket
+import struct
+import tempfile
+import argparse
+import threading
+from multiprocessing import shared_memory
+import numpy as np
+
+MAGIC = b"QI"
+VERSION = 1
+HELLO = 1
+INFER = 2
+OK = 0
+ERROR = 1
+
+REQUEST = struct.Struct("<2sBBII")
+REPLY = struct.Struct("<2sBBIII")
+
+target_size = (224, 224)
+image_bytes = target_size[0] * target_size[1] * 3 * 4
+
+if hasattr(socket, "AF_UNIX"):
+    default_address = os.path.join(tempfile.gettempdir(), "qarm_inference.sock")
+else:
+    default_address = ("127.0.0.1", 9110)
+
+def _socket_for(address):
+    family = socket.AF_INET if isinstance(address, tuple) else socket.AF_UNIX
+    return socket.socket(family, socket.SOCK_STREAM)
+
+def _recv_exact(sock, n):
+    data = bytearray()
+    while len(data) < n:
+        block = sock.recv(n - len(data))
+        if not block:
+            raise ConnectionError("connection closed")
+        data += block
+    return bytes(data)
+
+def _attach(name):
+    # Attach without handing the block to this process's resource tracker,
+    # otherwise it would unlink the client's memory when the server exits
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)   # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+# === Server ===
+class _Connection:
+    def __init__(self, sock):
+        self.sock = sock
+        self.shm = None
+        self.images = None
+        self.capacity = 0
+        self.lock = threading.Lock()        # guards images against close() mid-copy
+        self.send_lock = threading.Lock()
+
+    def reply(self, status, request_id, count=0, payload=b""):
+        try:
+            with self.send_lock:
+                self.sock.sendall(REPLY.pack(MAGIC, VERSION, status, request_id, count, len(payload)) + payload)
+        except OSError:
+            pass  # client went away; its handler cleans up
+
+    def close(self):
+        with self.lock:
+            self.images = None
+            if self.shm is not None:
+                self.shm.close()
+                self.shm = None
+        self.sock.close()
+
+class InferenceServer:
+    def __init__(self, model, model_path, address=default_address, max_batch=32, max_wait=0.005):
+        self.model = model
+        self.model_path = os.path.abspath(model_path)
+        self.address = address
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.n_classes = None
+        # Batches from all clients are gathered into one preallocated input tensor
+        self.batch = np.empty((max_batch, *target_size, 3), dtype=np.float32)
+        self.pending = queue.Queue()
+        self.connections = set()
+        self.stats = {"requests": 0, "images": 0, "batches": 0, "errors": 0}
+        self._stop = threading.Event()
+        self.sock = None
+
+    def _listen(self):
+        if not isinstance(self.address, tuple) and os.path.exists(self.address):
+            # A socket file left behind by a crashed server; refuse if one is still running
+            probe = _socket_for(self.address)
+            try:
+                probe.connect(self.address)
+                raise RuntimeError(f"An inference server is already listening on {self.address}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.address)
+            finally:
+                probe.close()
+        self.sock = _socket_for(self.address)
+        if isinstance(self.address, tuple):
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(self.address)
+        self.sock.listen()
+
+    def serve_forever(self, n_classes):
+        self.n_classes = n_classes
+        self._listen()
+        threading.Thread(target=self._batcher, name="InferenceBatcher", daemon=True).start()
+        self.sock.settimeout(0.5)
+        while not self._stop.is_set():
+            try:
+                conn, _ = self.sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            conn.settimeout(None)
+            threading.Thread(target=self._handle, args=(_Connection(conn),), name="InferenceClient", daemon=True).start()
+
+    def _handle(self, conn):
+        self.connections.add(conn)
+        try:
+            while True:
+                magic, version, kind, request_id, count = REQUEST.unpack(_recv_exact(conn.sock, REQUEST.size))
+                if magic != MAGIC or version != VERSION:
+                    break
+                if kind == HELLO:
+                    name = _recv_exact(conn.sock, count).decode()
+                    with conn.lock:
+                        conn.shm = _attach(name)
+                        conn.capacity = min(conn.shm.size // image_bytes, self.max_batch)
+                        conn.images = np.ndarray((conn.capacity, *target_size, 3), dtype=np.float32, buffer=conn.shm.buf)
+                    conn.reply(OK, request_id, self.n_classes, f"{conn.capacity}|{self.model_path}".encode())
+                elif kind == INFER and conn.images is not None and 0 < count <= conn.capacity:
+                    self.pending.put((conn, request_id, count))
+                else:
+                    conn.reply(ERROR, request_id, 0, f"bad request (kind {kind}, {count} images)".encode())
+        except (ConnectionError, OSError, struct.error):
+            pass
+        finally:
+            self.connections.discard(conn)
+            conn.close()
+
+    def _batcher(self):
+        carry = None
+        while not self._stop.is_set():
+            if carry is not None:
+                first, carry = carry, None
+            else:
+                try:
+                    first = self.pending.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+            jobs, total = [first], first[2]
+            # Each client has at most one request in flight, so waiting only helps
+            # when another client could send one
+            deadline = time.perf_counter() + (self.max_wait if len(self.connections) > 1 else 0.0)
+            while total < self.max_batch:
+                try:
+                    job = self.pending.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if total + job[2] > self.max_batch:
+                    carry = job
+                    break
+                jobs.append(job)
+                total += job[2]
+            self._run(jobs)
+
+    def _run(self, jobs):
+        # Copy each client's images into the batch tensor; the copy is small next to
+        # the forward pass and lets a client disconnect while its batch is running
+        placed, n = [], 0
+        for conn, request_id, count in jobs:
+            with conn.lock:
+                if conn.images is None:
+                    continue
+                self.batch[n:n + count] = conn.images[:count]
+            placed.append((conn, request_id, n, count))
+            n += count
+        if not placed:
+            return
+        try:
+            probs = np.asarray(self.model.predict_on_batch(self.batch[:n]), dtype=np.float32)
+        except Exception as e:
+            self.stats["errors"] += 1
+            for conn, request_id, _, _ in placed:
+                conn.reply(ERROR, request_id, 0, str(e).encode())
+            return
+        for conn, request_id, offset, count in placed:
+            conn.reply(OK, request_id, count, probs[offset:offset + count].tobytes())
+        self.stats["requests"] += len(placed)
+        self.stats["images"] += n
+        self.stats["batches"] += 1
+
+    def close(self):
+        self._stop.set()
+        if self.sock is not None:
+            self.sock.close()
+        for conn in list(self.connections):
+            conn.close()
+        if not isinstance(self.address, tuple) and os.path.exists(self.address):
+            os.unlink(self.address)
+        batches = max(self.stats["batches"], 1)
+        print("--- Inference server: " + ", ".join(f"{k} {v}" for k, v in self.stats.items())
+              + f", mean batch {self.stats['images'] / batches:.1f} images ---")
+
+# === Client ===
+class InferenceClient:
+    # Drop-in for a Keras model in fruit_ident / eval_pipeline: predict_on_batch(x)
+    def __init__(self, address=default_address, capacity=32, timeout=30.0):
+        self.address = address
+        self.sock = _socket_for(address)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(address)
+        except OSError:
+            self.sock.close()
+            raise
+        self.shm = shared_memory.SharedMemory(create=True, size=capacity * image_bytes)
+        self.request_id = 0
+        self._lock = threading.Lock()
+        try:
+            name = self.shm.name.encode()
+            self.sock.sendall(REQUEST.pack(MAGIC, VERSION, HELLO, 0, len(name)) + name)
+            self.n_classes, payload = self._reply(0)
+            capacity, self.model_path = payload.decode().split("|", 1)
+            self.capacity = int(capacity)
+        except Exception:
+            self.close()
+            raise
+        self.images = np.ndarray((self.capacity, *target_size, 3), dtype=np.float32, buffer=self.shm.buf)
+
+    def _reply(self, request_id):
+        magic, version, status, reply_id, count, length = REPLY.unpack(_recv_exact(self.sock, REPLY.size))
+        payload = _recv_exact(self.sock, length)
+        if magic != MAGIC or version != VERSION or reply_id != request_id:
+            raise ConnectionError("unexpected reply from the inference server")
+        if status != OK:
+            raise RuntimeError(f"Inference server: {payload.decode(errors='replace')}")
+        return count, payload
+
+    def predict_on_batch(self, x):
+        x = np.asarray(x)
+        out = np.empty((len(x), self.n_classes), dtype=np.float32)
+        with self._lock:
+            for start in range(0, len(x), self.capacity):
+                count = min(self.capacity, len(x) - start)
+                self.images[:count] = x[start:start + count]
+                self.request_id = (self.request_id + 1) & 0xFFFFFFFF
+                self.sock.sendall(REQUEST.pack(MAGIC, VERSION, INFER, self.request_id, count))
+                _, payload = self._reply(self.request_id)
+                out[start:start + count] = np.frombuffer(payload, dtype=np.float32).reshape(count, self.n_classes)
+        return out
+
+    def close(self):
+        self.images = None
+        self.sock.close()
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+def main():
+    import fruit_ident
+    parser = argparse.ArgumentParser(description="Shared fruit classification server")
+    parser.add_argument("--model", default=fruit_ident.model_path)
+    parser.add_argument("--max-batch", type=int, default=32, help="images per forward pass")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="how long to wait for other clients' requests")
+    args = parser.parse_args()
+
+    # The server itself always runs the model in-process
+    fruit_ident.backend = "local"
+    fruit_ident.model_path = args.model
+    model = fruit_ident.get_model()
+
+    server = InferenceServer(model, args.model, default_address, args.max_batch, args.max_wait_ms / 1e3)
+    print(f"Serving {args.model} on {default_address} (Ctrl+C to stop)")
+    try:
+        server.serve_forever(len(fruit_ident.class_labels))
+    except KeyboardInterrupt:
+        print("Stopping.")
+    finally:
+        server.close()
+
+if __name__ == "__main__":
+    main()
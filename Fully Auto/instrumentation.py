@@ -0,0 +1,199 @@
+# instrumentation.py
+# Lightweight hot-path metrics: timers and counters aggregated into
+# fixed-memory histograms, exported in Prometheus text format to a file
+# (node_exporter textfile collector) or a local HTTP endpoint.
+#
+# Disabled by default. Enable with QARM_METRICS=1 or enable(); while disabled,
+# timer() returns a shared no-op context manager and count() returns at once.
+#
+#   with timer("predict_seconds"):
+#       model.predict_on_batch(batch)
+
+import os
+import time
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+enabled = os.environ.get("QARM_METRICS", "0").strip().lower() not in ("", "0", "false", "no")
+prefix = "qarm_"
+
+# Histogram bucket upper bounds (s): 50 us doubling up to ~105 s
+BUCKETS = tuple(5e-5 * 2 ** i for i in range(22))
+
+class Histogram:
+    def __init__(self, name, help_text=""):
+        self.name = name
+        self.help_text = help_text
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(BUCKETS, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-quantile
+        with self._lock:
+            target = q * self.count
+            running = 0
+            for i, c in enumerate(self.counts):
+                running += c
+                if running >= target and c:
+                    return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+        return float("nan")
+
+class Counter:
+    def __init__(self, name, help_text=""):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self._lock:
+            self.value += n
+
+_histograms = {}
+_counters = {}
+_registry_lock = threading.Lock()
+
+def histogram(name, help_text=""):
+    h = _histograms.get(name)
+    if h is None:
+        with _registry_lock:
+            h = _histograms.setdefault(name, Histogram(name, help_text))
+    return h
+
+def counter(name, help_text=""):
+    c = _counters.get(name)
+    if c is None:
+        with _registry_lock:
+            c = _counters.setdefault(name, Counter(name, help_text))
+    return c
+
+class _Timer:
+    __slots__ = ("_hist", "_start")
+
+    def __init__(self, hist):
+        self._hist = hist
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._hist.observe(time.perf_counter() - self._start)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+def timer(name, help_text=""):
+    if not enabled:
+        return _NULL_TIMER
+    return _Timer(histogram(name, help_text))
+
+def count(name, n=1, help_text=""):
+    if enabled:
+        counter(name, help_text).inc(n)
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+def instrument_method(obj, method_name, metric, help_text=""):
+    # Time every call of obj.method_name (e.g. a QArm's read_write_std); no-op while disabled
+    if not enabled:
+        return obj
+    method = getattr(obj, method_name)
+    hist = histogram(metric, help_text)
+
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            hist.observe(time.perf_counter() - start)
+
+    setattr(obj, method_name, timed)
+    return obj
+
+# === Export ===
+def render_prometheus():
+    lines = []
+    for name, h in sorted(_histograms.items()):
+        metric = prefix + name
+        with h._lock:
+            counts, total, n = list(h.counts), h.sum, h.count
+        if h.help_text:
+            lines.append(f"# HELP {metric} {h.help_text}")
+        lines.append(f"# TYPE {metric} histogram")
+        running = 0
+        for bound, c in zip(BUCKETS, counts):
+            running += c
+            lines.append(f'{metric}_bucket{{le="{bound:.6g}"}} {running}')
+        lines.append(f'{metric}_bucket{{le="+Inf"}} {n}')
+        lines.append(f"{metric}_sum {total:.9f}")
+        lines.append(f"{metric}_count {n}")
+    for name, c in sorted(_counters.items()):
+        metric = prefix + name
+        if c.help_text:
+            lines.append(f"# HELP {metric} {c.help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {c.value}")
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(path):
+    # Atomic replace so a scraper never reads a half-written file
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+
+def start_file_exporter(path, interval=5.0):
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                write_prometheus(path)
+            except OSError as e:
+                print(f"Could not write metrics to {path}: {e}")
+
+    thread = threading.Thread(target=run, name="MetricsFile", daemon=True)
+    thread.start()
+    return thread
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_http_server(port=9108, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="MetricsHTTP", daemon=True).start()
+    print(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,106 @@
+# jog.py
+# Continuous velocity jogging for manual teleoperation. Held keys (read with
+# pygame.key.get_pressed every tick) set a target velocity per joint; a fixed-
+# rate loop ramps the actual velocity towards it under an acceleration limit,
+# integrates it into the joint command and sends read_write_std every tick.
+# Status printing happens on its own thread at a few Hz so it never stalls the
+# control loop.
+
+import time
+import threading
+import numpy as np
+import pygame
+from trajectory import max_velocity, max_acceleration
+
+jog_rate = 200.0                      # Hz
+jog_velocity = 0.5 * max_velocity     # rad/s with a key held
+jog_acceleration = max_acceleration   # rad/s^2
+gripper_speed = 1.0                   # full range per second
+status_rate = 5.0                     # Hz
+
+class StatusPrinter:
+    # Prints the newest joint/gripper state at most status_rate times a second
+    def __init__(self, rate=status_rate):
+        self.period = 1.0 / rate
+        self._lock = threading.Lock()
+        self._state = None
+        self._printed = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="JogStatus", daemon=True)
+        self._thread.start()
+
+    def update(self, joint_angles, gripper, loop_hz):
+        with self._lock:
+            self._state = (joint_angles.copy(), gripper, loop_hz)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(1.0)
+
+    def _run(self):
+        while not self._stop.wait(self.period):
+            with self._lock:
+                state = self._state
+            if state is None:
+                continue
+            joint_angles, gripper, loop_hz = state
+            shown = (tuple(np.round(np.rad2deg(joint_angles), 1)), round(gripper, 2))
+            if shown == self._printed:
+                continue
+            self._printed = shown
+            print(f"Joints (deg): {np.around(np.rad2deg(joint_angles), 1)}  Gripper: {gripper:.2f}  ({loop_hz:.0f} Hz)")
+
+def run_jog(myArm, joint_angles, gripper, led_cmd, key_mappings, joint_limits, rate=jog_rate):
+    # key_mappings: {pygame key: (joint_index or -1 for the gripper, direction)}.
+    # Runs until ESC / window close; returns the final (joint_angles, gripper).
+    joint_angles = np.array(joint_angles, dtype=np.float64)
+    velocity = np.zeros(4)
+    joint_keys = [(key, j, d) for key, (j, d) in key_mappings.items() if j >= 0]
+    gripper_keys = [(key, d) for key, (j, d) in key_mappings.items() if j < 0]
+    period = 1.0 / rate
+    status = StatusPrinter()
+
+    start = last = time.perf_counter()
+    ticks = 0
+    running = True
+    try:
+        while running and myArm.status:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                    print("Exiting...")
+                    running = False
+
+            # Held keys -> target velocity (opposite keys cancel)
+            keys = pygame.key.get_pressed()
+            direction = np.zeros(4)
+            for key, j, d in joint_keys:
+                if keys[key]:
+                    direction[j] += d
+            grip_direction = sum(d for key, d in gripper_keys if keys[key])
+
+            # Integrate with the measured tick length so timing jitter doesn't change the speed
+            now = time.perf_counter()
+            dt = min(now - last, 4 * period)
+            last = now
+            step = jog_acceleration * dt
+            velocity += np.clip(np.clip(direction, -1, 1) * jog_velocity - velocity, -step, step)
+            joint_angles += velocity * dt
+            clipped = np.clip(joint_angles, joint_limits[:, 0], joint_limits[:, 1])
+            velocity[clipped != joint_angles] = 0.0
+            joint_angles = clipped
+            gripper = float(np.clip(gripper + np.sign(grip_direction) * gripper_speed * dt, 0.0, 1.0))
+
+            myArm.read_write_std(phiCMD=joint_angles, gprCMD=gripper, baseLED=led_cmd)
+            ticks += 1
+            status.update(joint_angles, gripper, ticks / max(now - start, 1e-9))
+
+            # Fixed rate; after an overrun, restart the schedule instead of bursting to catch up
+            next_tick = start + ticks * period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -period:
+                start, ticks = time.perf_counter(), 0
+    finally:
+        status.close()
+    return joint_angles, gripper
@@ -0,0 +1,86 @@
+# motion.py
+# Closed-loop motion completion for the QArm. Instead of sleeping a fixed time
+# after each command, poll the measured joint positions at a high rate and
+# return as soon as the arm has arrived and stopped (or a timeout expires).
+
+import time
+import numpy as np
+
+# === Tolerances (tune on the real arm) ===
+joint_tolerance = 0.02          # rad, max |measured - commanded| over joints 1-4
+velocity_tolerance = 0.05       # rad/s, max joint speed to count as stopped
+gripper_velocity_tolerance = 0.05
+gripper_min_time = 0.15         # s, give the gripper time to start moving before checking for a stall
+poll_rate = 200.0               # Hz
+move_timeout = 4.0              # s
+gripper_timeout = 1.5           # s
+
+# label -> list of measured durations (s)
+move_times = {}
+
+def _poll(myArm, phiCmd, gripCmd, led_cmd, settled, timeout, rate):
+    # Re-sending the same set-point refreshes the measurements without changing the command
+    period = 1.0 / rate
+    start = time.perf_counter()
+    prev = np.array(myArm.measJointPosition, dtype=np.float64)
+    prev_t = start
+    next_tick = start + period
+    while True:
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        next_tick += period
+
+        myArm.read_write_std(phiCMD=phiCmd, gprCMD=gripCmd, baseLED=led_cmd)
+        now = time.perf_counter()
+        meas = np.array(myArm.measJointPosition, dtype=np.float64)
+        vel = (meas - prev) / max(now - prev_t, 1e-6)
+        prev, prev_t = meas, now
+
+        if settled(meas, vel, now - start):
+            return True, now - start
+        if now - start > timeout:
+            return False, now - start
+
+def wait_for_motion(myArm, phiCmd, gripCmd, led_cmd, label="move",
+                    tolerance=None, vel_tolerance=None, timeout=None, rate=None, since=None):
+    # since: perf_counter() when the move was commanded, if earlier than this call
+    tolerance = joint_tolerance if tolerance is None else tolerance
+    vel_tolerance = velocity_tolerance if vel_tolerance is None else vel_tolerance
+    target = np.asarray(phiCmd, dtype=np.float64)
+
+    def settled(meas, vel, elapsed):
+        return (np.max(np.abs(meas[0:4] - target)) < tolerance
+                and np.max(np.abs(vel[0:4])) < vel_tolerance)
+
+    reached, duration = _poll(myArm, phiCmd, gripCmd, led_cmd, settled,
+                              move_timeout if timeout is None else timeout,
+                              poll_rate if rate is None else rate)
+    if since is not None:
+        duration = time.perf_counter() - since
+    move_times.setdefault(label, []).append(duration)
+    if not reached:
+        error = np.max(np.abs(np.asarray(myArm.measJointPosition[0:4]) - target))
+        print(f"Timed out after {duration:.2f} s waiting for {label} (joint error {error:.3f} rad)")
+    return reached, duration
+
+def wait_for_gripper(myArm, phiCmd, gripCmd, led_cmd, label="gripper",
+                     vel_tolerance=None, timeout=None, rate=None):
+    # The gripper stalls on the fruit before reaching its command, so only wait for it to stop
+    vel_tolerance = gripper_velocity_tolerance if vel_tolerance is None else vel_tolerance
+
+    def settled(meas, vel, elapsed):
+        return elapsed >= gripper_min_time and abs(vel[4]) < vel_tolerance
+
+    reached, duration = _poll(myArm, phiCmd, gripCmd, led_cmd, settled,
+                              gripper_timeout if timeout is None else timeout,
+                              poll_rate if rate is None else rate)
+    move_times.setdefault(label, []).append(duration)
+    return reached, duration
+
+def print_move_summary():
+    if not move_times:
+        return
+    print("--- Move times (s): label, count, mean, max ---")
+    for label, times in move_times.items():
+        print(f"{label:<16} {len(times):>4} {np.mean(times):6.2f} {np.max(times):6.2f}")
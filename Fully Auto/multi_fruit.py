@@ -0,0 +1,156 @@
+# multi_fruit.py
+# Several fruit per frame: segment every fruit in one pass (union of the fruit
+# colour ranges, plus green for unripe fruit), classify all crops in a single
+# batched forward pass, locate each one in 3D from depth, and plan the pick
+# order that minimises arm travel home -> pick -> bin -> pick -> bin ... -> home.
+#
+# Pick order is an asymmetric TSP (moving from fruit i to fruit j costs the
+# distance from i's bin to j's pick point). Solved exactly with Held-Karp DP
+# up to held_karp_max fruit, otherwise greedy nearest-neighbour + 2-opt.
+
+import os
+import sys
+from collections import namedtuple
+import numpy as np
+import cv2
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Center_line"))
+from Center_of_mass import FRUIT_HSV_RANGES, MORPH_KERNEL
+from fruit_ident import classify_batch
+from pick_point import estimate_pick_point, grasp_gamma
+
+# Unripe fruit is green and falls outside every ripe/rotten range above
+UNRIPE_HSV_RANGE = ((35, 60, 60), (85, 255, 255))
+
+min_area = 400        # px; smaller blobs are noise
+crop_padding = 0.15   # fraction of the box added around each crop for the classifier
+held_karp_max = 10
+
+Detection = namedtuple("Detection", ["bbox", "centroid", "area", "label"])
+Fruit = namedtuple("Fruit", ["fruit", "quality", "confidence", "bbox", "target", "gamma"])
+
+def _all_ranges():
+    ranges = [r for fruit_ranges in FRUIT_HSV_RANGES.values() for r in fruit_ranges]
+    ranges.append(UNRIPE_HSV_RANGE)
+    # Duplicates (tomato/strawberry share a red range) would only cost an extra inRange
+    return list(dict.fromkeys(ranges))
+
+ALL_RANGES = _all_ranges()
+
+def segment_fruits(frame):
+    # One HSV conversion and one labelling pass for all fruit.
+    # Returns (detections sorted by area, label image)
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    mask = None
+    for lower, upper in ALL_RANGES:
+        part = cv2.inRange(hsv, np.array(lower), np.array(upper))
+        mask = part if mask is None else cv2.bitwise_or(mask, part)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, MORPH_KERNEL)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, MORPH_KERNEL)
+
+    n, labels, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    keep = np.flatnonzero(stats[1:, cv2.CC_STAT_AREA] >= min_area) + 1
+    keep = keep[np.argsort(-stats[keep, cv2.CC_STAT_AREA])]
+    detections = [
+        Detection(tuple(int(v) for v in stats[k, :4]), tuple(centroids[k]), int(stats[k, cv2.CC_STAT_AREA]), int(k))
+        for k in keep
+    ]
+    return detections, labels
+
+def crop(frame, bbox, padding=crop_padding):
+    x, y, w, h = bbox
+    pad_x, pad_y = int(padding * w), int(padding * h)
+    x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+    x1, y1 = min(frame.shape[1], x + w + pad_x), min(frame.shape[0], y + h + pad_y)
+    return frame[y0:y1, x0:x1]
+
+def find_fruits(frame, depth=None, calibration=None, orient=True):
+    # Every fruit in a BGR frame, classified in one batch and (with depth in metres,
+    # as from CameraService / imageBufferDepthM) located in the base frame
+    detections, labels = segment_fruits(frame)
+    if not detections:
+        return []
+    results = classify_batch([crop(frame, d.bbox) for d in detections], batch_size=len(detections), bgr=True)
+
+    fruits = []
+    for d, (fruit, quality, confidence) in zip(detections, results):
+        target, gamma = None, 0.0
+        if depth is not None and calibration is not None:
+            mask = labels == d.label
+            pick_point = estimate_pick_point(mask, depth, calibration)
+            if pick_point is not None:
+                target = pick_point.position
+                gamma = grasp_gamma(mask, target, calibration) if orient else 0.0
+        fruits.append(Fruit(fruit, quality, confidence, d.bbox, target, gamma))
+    return fruits
+
+# === Pick-order planning ===
+def _distances(a, b):
+    return np.linalg.norm(a[:, None, :] - b[None, :, :], axis=2)
+
+def tour_cost(order, start, move, end):
+    order = np.asarray(order)
+    return start[order[0]] + move[order[:-1], order[1:]].sum() + end[order[-1]]
+
+def _held_karp(start, move, end):
+    n = len(start)
+    full = (1 << n) - 1
+    cost = np.full((1 << n, n), np.inf)
+    parent = np.full((1 << n, n), -1, dtype=np.int64)
+    for j in range(n):
+        cost[1 << j, j] = start[j]
+    for subset in range(1, full + 1):
+        members = [j for j in range(n) if subset >> j & 1]
+        if len(members) < 2:
+            continue
+        for j in members:
+            prev = subset ^ (1 << j)
+            candidates = cost[prev] + move[:, j]
+            i = int(np.argmin(candidates))
+            cost[subset, j] = candidates[i]
+            parent[subset, j] = i
+    last = int(np.argmin(cost[full] + end))
+    order, subset = [], full
+    while last >= 0:
+        order.append(last)
+        subset, last = subset ^ (1 << last), parent[subset, last]
+    return order[::-1]
+
+def _greedy_two_opt(start, move, end):
+    n = len(start)
+    order, left = [int(np.argmin(start))], set(range(n))
+    left.remove(order[0])
+    while left:
+        rest = np.array(sorted(left))
+        nxt = int(rest[np.argmin(move[order[-1], rest])])
+        order.append(nxt)
+        left.remove(nxt)
+
+    # Segment reversal changes every edge inside an asymmetric tour, so score whole tours
+    best = tour_cost(order, start, move, end)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(n - 1):
+            for k in range(i + 1, n):
+                candidate = order[:i] + order[i:k + 1][::-1] + order[k + 1:]
+                cost = tour_cost(candidate, start, move, end)
+                if cost < best - 1e-12:
+                    order, best, improved = candidate, cost, True
+    return order
+
+def plan_pick_order(picks, drops, home):
+    # picks, drops: (n, 3) pick points and their destination bins; returns the visiting order
+    picks = np.asarray(picks, dtype=np.float64).reshape(-1, 3)
+    drops = np.asarray(drops, dtype=np.float64).reshape(-1, 3)
+    home = np.asarray(home, dtype=np.float64).reshape(1, 3)
+    n = len(picks)
+    if n <= 1:
+        return list(range(n))
+    start = _distances(home, picks)[0]
+    end = _distances(drops, home)[:, 0]
+    move = _distances(drops, picks)
+    np.fill_diagonal(move, np.inf)
+    if n <= held_karp_max:
+        return _held_karp(start, move, end)
+    return _greedy_two_opt(start, move, end)
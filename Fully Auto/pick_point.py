@@ -0,0 +1,157 @@
+# pick_point.py
+# 3D pick point from the fruit's colour mask and the RealSense depth image.
+# Masked pixels are deprojected to camera-frame points in one vectorised pass,
+# depth outliers (edges, background bleeding through the mask) are rejected with
+# a median/MAD test, and the robust centroid and top-surface height are mapped
+# into the QArm base frame with the stored extrinsic calibration.
+#
+# Depth is assumed registered to the colour image (same intrinsics). The RealSense
+# is wrist-mounted, so T_base_cam is the camera pose with the arm at home, where
+# Full_auto captures every image. Without camera_calibration.json there is no
+# depth picking: load_calibration returns None and the arm uses Pick_pose.
+#
+# grasp_gamma turns the mask's orientation (image moments, Center_of_mass) into
+# the wrist angle for qarm_inverse_kinematics, so elongated fruit such as bananas
+# are grasped across their short axis. It needs the wrist's zero and direction,
+# measured on the arm and stored in the calibration file; without them gamma is 0.
+
+import os
+import sys
+import json
+from collections import namedtuple
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Center_line"))
+from Center_of_mass import mask_orientation
+
+calibration_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "camera_calibration.json")
+
+# Depth window (m) and outlier threshold (in MADs)
+depth_range = (0.10, 1.50)
+outlier_mads = 3.0
+min_points = 50
+# Grasp this far below the top of the fruit (m)
+grasp_depth = 0.02
+# Below this major/minor axis ratio a fruit has no preferred grasp direction
+min_elongation = 1.3
+
+PickPoint = namedtuple("PickPoint", ["position", "surface_z", "centroid_cam", "n_points"])
+
+class Calibration:
+    def __init__(self, intrinsics, T_base_cam, wrist=None):
+        self.fx, self.fy = float(intrinsics["fx"]), float(intrinsics["fy"])
+        self.cx, self.cy = float(intrinsics["cx"]), float(intrinsics["cy"])
+        self.T_base_cam = np.asarray(T_base_cam, dtype=np.float64)
+        if self.T_base_cam.shape != (4, 4):
+            raise ValueError("T_base_cam must be a 4x4 homogeneous transform")
+        # {"gamma_offset": wrist angle (rad) at which the jaws close along the arm's radial
+        # direction, "sign": +1 if positive gamma turns the jaws anticlockwise seen from above}
+        self.wrist = None
+        if wrist is not None:
+            sign = float(wrist["sign"])
+            if sign not in (1.0, -1.0):
+                raise ValueError("wrist sign must be +1 or -1")
+            self.wrist = (float(wrist["gamma_offset"]), sign)
+        # Per-column/row ray factors, rebuilt only when the image size changes
+        self._rays = None
+
+    def rays(self, shape):
+        height, width = shape[:2]
+        if self._rays is None or self._rays[0].shape[0] != width or self._rays[1].shape[0] != height:
+            self._rays = ((np.arange(width) - self.cx) / self.fx, (np.arange(height) - self.cy) / self.fy)
+        return self._rays
+
+    def to_base(self, points):
+        return points @ self.T_base_cam[:3, :3].T + self.T_base_cam[:3, 3]
+
+def load_calibration(path=calibration_path):
+    # {"intrinsics": {"fx":..,"fy":..,"cx":..,"cy":..}, "T_base_cam": 4x4 nested list,
+    #  optional "wrist": {"gamma_offset":.., "sign":..} to turn the wrist to the fruit}
+    # Returns None (pick at Pick_pose) when there is no complete calibration
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except OSError:
+        print(f"No camera calibration at {path}, depth picking disabled (using Pick_pose).")
+        return None
+    if "intrinsics" not in data or "T_base_cam" not in data:
+        print(f"{path} needs both 'intrinsics' and 'T_base_cam', depth picking disabled (using Pick_pose).")
+        return None
+    calibration = Calibration(data["intrinsics"], data["T_base_cam"], data.get("wrist"))
+    if calibration.wrist is None:
+        print("No wrist calibration, picking with gamma = 0.")
+    return calibration
+
+def deproject(mask, depth, calibration):
+    # (N, 3) camera-frame points for masked pixels with a valid depth.
+    # depth is in metres (imageBufferDepthM), (H, W) or (H, W, 1)
+    if depth.ndim == 3:
+        depth = depth[..., 0]
+    ys, xs = np.nonzero(mask)
+    z = depth[ys, xs].astype(np.float64)
+    valid = (z > depth_range[0]) & (z < depth_range[1])
+    xs, ys, z = xs[valid], ys[valid], z[valid]
+    ray_x, ray_y = calibration.rays(depth.shape)
+    return np.column_stack((ray_x[xs] * z, ray_y[ys] * z, z))
+
+def reject_outliers(points):
+    # Keep points whose depth is within outlier_mads MADs of the median depth
+    z = points[:, 2]
+    median = np.median(z)
+    mad = np.median(np.abs(z - median))
+    # Flat surfaces give MAD ~ 0; allow the sensor's ~2 mm noise
+    return points[np.abs(z - median) <= outlier_mads * max(1.4826 * mad, 0.002)]
+
+def estimate_pick_point(mask, depth, calibration):
+    # PickPoint in the base frame, or None when there is too little valid depth
+    points = deproject(mask, depth, calibration)
+    if len(points) < min_points:
+        return None
+    points = reject_outliers(points)
+    if len(points) < min_points:
+        return None
+
+    centroid_cam = np.median(points, axis=0)
+    base = calibration.to_base(points)
+    # Top surface: robust high percentile of the height above the base
+    surface_z = float(np.percentile(base[:, 2], 90))
+    xy = np.median(base[:, :2], axis=0)
+    position = np.array([xy[0], xy[1], surface_z - grasp_depth])
+    return PickPoint(position, surface_z, centroid_cam, len(points))
+
+def wrist_gamma(angle_deg, target, calibration):
+    # Gripper direction in the image (deg) -> wrist gamma (rad) for a pick at target
+    gamma_offset, sign = calibration.wrist
+    a = np.deg2rad(angle_deg)
+    direction = calibration.T_base_cam[:3, :3] @ np.array([np.cos(a), np.sin(a), 0.0])
+    # Grip direction relative to the arm's radial direction; the gripper is symmetric,
+    # so turn the shorter way (wrap to +-90 deg)
+    relative = np.arctan2(direction[1], direction[0]) - np.arctan2(target[1], target[0])
+    relative = (relative + np.pi / 2) % np.pi - np.pi / 2
+    # gamma_offset closes the jaws radially; the wrist turns them from there
+    return float(gamma_offset + sign * relative)
+
+def grasp_gamma(mask, target, calibration):
+    # Wrist gamma for the fruit in mask; 0 without a wrist calibration, for round
+    # fruit or for an empty mask
+    if calibration.wrist is None:
+        return 0.0
+    orientation = mask_orientation(mask.astype(np.uint8, copy=False))
+    if orientation is None or orientation[2] < min_elongation:
+        return 0.0
+    return wrist_gamma(orientation[0], target, calibration)
+
+if __name__ == "__main__":
+    # Self-check of the wrist mapping: a radial grip direction must command exactly
+    # gamma_offset, and a tangential one gamma_offset + 90 deg (times the wrist sign).
+    # Camera looking straight down: image x -> base -y, image y -> base -x
+    T = [[0, -1, 0, 0.65], [-1, 0, 0, 0], [0, 0, -1, 0.75], [0, 0, 0, 1]]
+    intrinsics = {"fx": 615.0, "fy": 615.0, "cx": 320.0, "cy": 240.0}
+    for offset, sign in ((0.0, 1.0), (0.3, 1.0), (-0.2, -1.0)):
+        calibration = Calibration(intrinsics, T, {"gamma_offset": offset, "sign": sign})
+        for target, radial_deg in (([0.65, 0.0, 0.1], 90.0), ([0.3, 0.3, 0.1], 45.0)):
+            gamma = wrist_gamma(radial_deg, target, calibration)
+            assert abs(gamma - offset) < 1e-9, (offset, sign, target, gamma)
+            gamma = wrist_gamma(radial_deg - 90.0, target, calibration)
+            assert abs(abs(gamma - offset) - np.pi / 2) < 1e-9, (offset, sign, target, gamma)
+    print("wrist_gamma OK")
@@ -0,0 +1,94 @@
+# pose_registry.py
+# Joint-space cache for the named sort positions. IK is solved once per pose at
+# startup (or loaded from pose_cache_<name>.json when the pose table hasn't changed),
+# checked against the joint limits, and then served directly as joint vectors.
+# The cache is keyed by the IK solver too, since the Quanser and simulator
+# utilities can pick different solutions for the same pose.
+
+import os
+import json
+import hashlib
+import numpy as np
+
+from qarm_kinematics import JOINT_LIMITS
+
+cache_dir = os.path.dirname(os.path.abspath(__file__))
+
+def cache_path_for(name):
+    # One cache file per pose set, so scripts with different tables don't evict each other
+    return os.path.join(cache_dir, f"pose_cache_{name}.json")
+
+def solver_name(myArmUtilities):
+    cls = type(myArmUtilities)
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+def pose_table_key(positions, gamma, joint_limits=JOINT_LIMITS, solver=""):
+    table = {
+        "solver": solver,
+        "positions": {name: [float(v) for v in positions[name]] for name in sorted(positions)},
+        "gamma": float(gamma),
+        "limits": np.round(joint_limits, 6).tolist()
+    }
+    return hashlib.sha256(json.dumps(table, sort_keys=True).encode()).hexdigest()
+
+def within_limits(phi, joint_limits=JOINT_LIMITS):
+    phi = np.asarray(phi, dtype=np.float64)
+    return bool(np.all(phi >= joint_limits[:, 0]) and np.all(phi <= joint_limits[:, 1]))
+
+class PoseRegistry:
+    def __init__(self, positions, myArmUtilities, gamma=0, path=cache_path_for("default"), joint_limits=JOINT_LIMITS):
+        self.positions = {name: np.array(p, dtype=np.float64) for name, p in positions.items()}
+        self.gamma = gamma
+        self.joint_limits = joint_limits
+        key = pose_table_key(positions, gamma, joint_limits, solver_name(myArmUtilities))
+
+        self._joints = self._load(path, key)
+        if self._joints is None:
+            self._joints = self._solve(myArmUtilities)
+            self._validate()
+            self._save(path, key)
+        else:
+            self._validate()
+
+    def _solve(self, myArmUtilities):
+        # Every pose is seeded from the same nominal, so its IK branch doesn't
+        # depend on which other poses are in the table
+        joints = {}
+        for name in self.positions:
+            _, phiCmd = myArmUtilities.qarm_inverse_kinematics(self.positions[name], self.gamma, np.zeros(4))
+            joints[name] = np.array(phiCmd, dtype=np.float64)
+        return joints
+
+    def _validate(self):
+        bad = []
+        for name, phi in self._joints.items():
+            if np.any(np.isnan(phi)):
+                bad.append(f"{name} {self.positions[name].tolist()}: no IK solution")
+            elif not within_limits(phi, self.joint_limits):
+                bad.append(f"{name} {self.positions[name].tolist()}: joint limits exceeded {np.round(np.rad2deg(phi), 1).tolist()} deg")
+        if bad:
+            raise ValueError("Invalid poses in position table:\n  " + "\n  ".join(bad))
+
+    def _load(self, path, key):
+        try:
+            with open(path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cache.get("key") != key or set(cache.get("joints", {})) != set(self.positions):
+            return None
+        return {name: np.array(phi, dtype=np.float64) for name, phi in cache["joints"].items()}
+
+    def _save(self, path, key):
+        cache = {"key": key, "joints": {name: phi.tolist() for name, phi in self._joints.items()}}
+        try:
+            with open(path, "w") as f:
+                json.dump(cache, f, indent=2)
+        except OSError as e:
+            print(f"Could not write pose cache {path}: {e}")
+
+    def __contains__(self, name):
+        return name in self._joints
+
+    def joints(self, name):
+        return self._joints[name].copy()
@@ -0,0 +1,158 @@
+# preprocess_cache.py
+# Content-addressed cache of preprocessed image tensors. Entries are keyed by the
+# sha256 of the source file plus the preprocessing parameters (size, resize
+# filter, dtype/scaling), stored as one .npy per entry and read back memory-
+# mapped, so a repeated run reads tensors straight from the page cache instead
+# of decoding and resizing again. Total size is bounded; least recently used
+# entries are evicted first.
+#
+# Shared by fruit_ident (upload mode) and the TestML evaluation scripts.
+# fruit_ident uses it when QARM_PREPROCESS_CACHE is set (to a directory, or to 1
+# for the default directory next to this file).
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tensor_cache")
+default_max_bytes = 2 * 1024 ** 3
+
+# Bump when the on-disk layout or a preprocessing implementation changes
+FORMAT_VERSION = 1
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+class PreprocessCache:
+    def __init__(self, directory=default_dir, max_bytes=default_max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # (path, size, mtime) -> content hash, so unchanged files are not re-hashed
+        self._digests = {}
+        os.makedirs(directory, exist_ok=True)
+
+        # Rebuild the LRU order from file modification times (bumped on every hit)
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith(".npy"):
+                st = os.stat(os.path.join(directory, name))
+                entries.append((st.st_mtime, name[:-4], st.st_size))
+        entries.sort()
+        self._entries = OrderedDict((key, size) for _, key, size in entries)
+        self._total = sum(self._entries.values())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npy")
+
+    def _digest(self, path):
+        st = os.stat(path)
+        stamp = (os.fspath(path), st.st_size, st.st_mtime_ns)
+        digest = self._digests.get(stamp)
+        if digest is None:
+            digest = self._digests[stamp] = file_digest(path)
+        return digest
+
+    def key(self, path, params):
+        params = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(f"{self._digest(path)}|{params}|{FORMAT_VERSION}".encode()).hexdigest()
+
+    def get(self, path, params, compute):
+        # Cached tensor for (file content, params) as a read-only memmap;
+        # compute(path) -> ndarray fills the cache on a miss
+        key = self.key(path, params)
+        entry = self._path(key)
+        with self._lock:
+            known = key in self._entries
+            if known:
+                self._entries.move_to_end(key)
+        if known:
+            try:
+                array = np.load(entry, mmap_mode="r")
+                os.utime(entry)
+                self.hits += 1
+                return array
+            except (OSError, ValueError):
+                # Evicted by another process or truncated; recompute below
+                self._forget(key)
+
+        self.misses += 1
+        array = np.ascontiguousarray(compute(path))
+        self._store(key, array)
+        return array
+
+    def _store(self, key, array):
+        entry = self._path(key)
+        tmp = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                np.save(f, array, allow_pickle=False)
+            os.replace(tmp, entry)
+        except OSError as e:
+            print(f"Could not write preprocess cache entry: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        size = os.path.getsize(entry)
+        with self._lock:
+            self._total += size - self._entries.get(key, 0)
+            self._entries[key] = size
+            self._entries.move_to_end(key)
+            evict = []
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                old_key, old_size = self._entries.popitem(last=False)
+                self._total -= old_size
+                evict.append(old_key)
+        for old_key in evict:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+    def _forget(self, key):
+        with self._lock:
+            size = self._entries.pop(key, None)
+            if size is not None:
+                self._total -= size
+
+    def clear(self):
+        with self._lock:
+            keys = list(self._entries)
+            self._entries.clear()
+            self._total = 0
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    @property
+    def size_bytes(self):
+        return self._total
+
+_default = None
+_default_lock = threading.Lock()
+
+def default_cache():
+    # Process-wide cache from QARM_PREPROCESS_CACHE, or None when unset
+    global _default
+    setting = os.environ.get("QARM_PREPROCESS_CACHE", "").strip()
+    if setting.lower() in ("", "0", "false", "no"):
+        return None
+    with _default_lock:
+        if _default is None:
+            directory = default_dir if setting.lower() in ("1", "true", "yes") else setting
+            _default = PreprocessCache(directory)
+    return _default
@@ -0,0 +1,21 @@
+# qarm_backend.py
+# Picks the QArm / RealSense / kinematics implementation for every script.
+#   QARM_BACKEND=hardware (default) - Quanser pal/hal libraries
+#   QARM_BACKEND=sim                - sim_qarm stand-ins, no hardware or Quanser install needed
+
+import os
+import sys
+
+backend = os.environ.get("QARM_BACKEND", "hardware").strip().lower()
+
+if backend == "sim":
+    from sim_qarm import SimQArm as QArm, SimQArmRealSense as QArmRealSense, SimQArmUtilities as QArmUtilities
+elif backend == "hardware":
+    # Add QArm library paths
+    sys.path.append(r"C:\Users\hitis\Documents\Quanser\0_libraries\python")
+    sys.path.append(r"C:\Users\hitis\Documents\Quanser\5_research\qarm\basic")
+
+    from pal.products.qarm import QArm, QArmRealSense
+    from hal.products.qarm import QArmUtilities
+else:
+    raise ValueError(f"Unknown QARM_BACKEND '{backend}' (expected 'hardware' or 'sim')")
@@ -0,0 +1,170 @@
+# qarm_kinematics.py
+# Vectorised forward/inverse kinematics for the 4-DOF QArm (same geometry and
+# conventions as hal.products.qarm.QArmUtilities) and a voxel reachability index.
+#
+#   phi = solve(points, gamma, phiPrev)      # (N, 3) targets -> (N, 4) joints, NaN rows if unreachable
+#   ok = reachable(points)                   # exact check: valid IK solution inside the joint limits
+#   index = ReachabilityIndex.load_or_build()
+#   ok = index.contains(points)              # O(1) lookup per point from the cached voxel grid
+
+import os
+import json
+import hashlib
+import numpy as np
+
+# === QArm geometry (m) ===
+L_1 = 0.14
+L_2 = 0.35
+L_3 = 0.05
+L_4 = 0.25
+L_5 = 0.15
+BETA = np.arctan2(L_3, L_2)
+LAMBDA_2 = np.hypot(L_2, L_3)
+LAMBDA_3 = L_4 + L_5
+
+# QArm joint ranges (rad) from the user manual: base, shoulder, elbow, wrist
+JOINT_LIMITS = np.deg2rad(np.array([
+    [-170, 170],
+    [-85, 85],
+    [-95, 75],
+    [-160, 160]
+], dtype=np.float64))
+
+def wrap(angle):
+    return (angle + np.pi) % (2 * np.pi) - np.pi
+
+def forward_kinematics(phi):
+    # (..., 4) joint angles -> (..., 3) end-effector positions
+    phi = np.asarray(phi, dtype=np.float64)
+    phi1, phi2, phi3 = phi[..., 0], phi[..., 1], phi[..., 2]
+    r = LAMBDA_2 * np.sin(phi2 + BETA) + LAMBDA_3 * np.cos(phi2 + phi3)
+    z = L_1 + LAMBDA_2 * np.cos(phi2 + BETA) - LAMBDA_3 * np.sin(phi2 + phi3)
+    return np.stack([r * np.cos(phi1), r * np.sin(phi1), z], axis=-1)
+
+def inverse_kinematics(points, gamma=0.0):
+    # (N, 3) targets -> (N, 4, 4): for each target the 4 candidate solutions
+    # (base facing / base flipped x elbow up / down), NaN where unreachable
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    x, y, z = points[:, 0], points[:, 1], points[:, 2]
+    rho = np.hypot(x, y)
+    h = (z - L_1)[:, None, None]
+
+    phi1_a = np.arctan2(y, x)
+    phi1 = np.stack([phi1_a, wrap(phi1_a + np.pi)], axis=1)[:, :, None]   # (N, 2, 1)
+    r = np.stack([rho, -rho], axis=1)[:, :, None]                          # (N, 2, 1)
+
+    K = (rho ** 2 + (z - L_1) ** 2 - LAMBDA_2 ** 2 - LAMBDA_3 ** 2) / (2 * LAMBDA_2 * LAMBDA_3)
+    with np.errstate(invalid="ignore"):
+        acos = np.where(np.abs(K) <= 1.0, np.arccos(np.clip(K, -1.0, 1.0)), np.nan)
+    delta = acos[:, None, None] * np.array([1.0, -1.0])                   # (N, 1, 2)
+
+    theta_a = np.arctan2(h, r) - np.arctan2(LAMBDA_3 * np.sin(delta), LAMBDA_2 + LAMBDA_3 * np.cos(delta))
+    phi2 = np.pi / 2 - theta_a - BETA
+    phi3 = -(theta_a + delta) - phi2
+    shape = phi2.shape
+    solutions = np.stack([
+        np.broadcast_to(phi1, shape), phi2, phi3, np.broadcast_to(np.asarray(gamma, dtype=np.float64), shape)
+    ], axis=-1)
+    solutions = wrap(solutions).reshape(-1, 4, 4)
+    # An unreachable target has no solution at all, including the base/wrist angles
+    solutions[np.isnan(solutions).any(axis=2)] = np.nan
+    return solutions
+
+def within_limits(phi, joint_limits=JOINT_LIMITS):
+    # (..., 4) -> (...,) bool; NaN counts as outside
+    phi = np.asarray(phi, dtype=np.float64)
+    return np.all((phi >= joint_limits[:, 0]) & (phi <= joint_limits[:, 1]), axis=-1)
+
+def select_solution(solutions, phiPrev, joint_limits=JOINT_LIMITS):
+    # (N, 4, 4) candidates -> (N, 4): the valid solution closest to phiPrev,
+    # preferring ones inside the joint limits; NaN rows where none is valid
+    valid = ~np.isnan(solutions).any(axis=2)
+    safe = np.nan_to_num(solutions)
+    prev = np.asarray(phiPrev, dtype=np.float64)[..., 0:4].reshape(-1, 1, 4)
+    cost = np.linalg.norm(safe - prev, axis=2) + np.where(within_limits(safe, joint_limits), 0.0, 100.0)
+    cost = np.where(valid, cost, np.inf)
+    best = np.argmin(cost, axis=1)
+    chosen = solutions[np.arange(len(solutions)), best]
+    chosen[~valid.any(axis=1)] = np.nan
+    return chosen
+
+def solve(points, gamma=0.0, phiPrev=np.zeros(4), joint_limits=JOINT_LIMITS):
+    return select_solution(inverse_kinematics(points, gamma), phiPrev, joint_limits)
+
+def reachable(points, gamma=0.0, joint_limits=JOINT_LIMITS):
+    # (N, 3) -> (N,) bool: some IK solution exists inside the joint limits
+    return within_limits(inverse_kinematics(points, gamma), joint_limits).any(axis=1)
+
+# === Reachability index ===
+index_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reachability.npz")
+
+# Workspace box (m) and voxel size; the arm reaches at most L_1 + LAMBDA_2 + LAMBDA_3 high
+default_bounds = np.array([[-0.80, 0.80], [-0.80, 0.80], [-0.40, 0.95]])
+default_resolution = 0.01
+
+class ReachabilityIndex:
+    # Boolean voxel grid: True where the voxel centre has an IK solution inside the
+    # joint limits (wrist angle gamma). Lookups are one floor() and one gather per point.
+    def __init__(self, grid, origin, resolution, key=None):
+        self.grid = grid
+        self.origin = np.asarray(origin, dtype=np.float64)
+        self.resolution = float(resolution)
+        self.key = key
+
+    @staticmethod
+    def table_key(bounds, resolution, gamma, joint_limits):
+        table = {
+            "geometry": [L_1, L_2, L_3, L_4, L_5], "bounds": np.round(bounds, 6).tolist(),
+            "resolution": resolution, "gamma": float(gamma), "limits": np.round(joint_limits, 6).tolist()
+        }
+        return hashlib.sha256(json.dumps(table, sort_keys=True).encode()).hexdigest()
+
+    @classmethod
+    def build(cls, bounds=default_bounds, resolution=default_resolution, gamma=0.0,
+              joint_limits=JOINT_LIMITS, chunk=200000):
+        bounds = np.asarray(bounds, dtype=np.float64)
+        shape = np.ceil((bounds[:, 1] - bounds[:, 0]) / resolution).astype(int)
+        axes = [bounds[i, 0] + (np.arange(shape[i]) + 0.5) * resolution for i in range(3)]
+        flat = np.empty(int(np.prod(shape)), dtype=bool)
+        # Chunked so the (N, 4, 4) candidate array stays small
+        for start in range(0, flat.size, chunk):
+            idx = np.unravel_index(np.arange(start, min(start + chunk, flat.size)), shape)
+            centres = np.column_stack([axes[i][idx[i]] for i in range(3)])
+            flat[start:start + len(centres)] = reachable(centres, gamma, joint_limits)
+        key = cls.table_key(bounds, resolution, gamma, joint_limits)
+        return cls(flat.reshape(shape), bounds[:, 0], resolution, key)
+
+    @classmethod
+    def load_or_build(cls, path=index_path, bounds=default_bounds, resolution=default_resolution,
+                      gamma=0.0, joint_limits=JOINT_LIMITS):
+        key = cls.table_key(np.asarray(bounds, dtype=np.float64), resolution, gamma, joint_limits)
+        try:
+            with np.load(path) as data:
+                if str(data["key"]) == key:
+                    shape = tuple(data["shape"])
+                    grid = np.unpackbits(data["bits"], count=int(np.prod(shape))).astype(bool).reshape(shape)
+                    return cls(grid, data["origin"], float(data["resolution"]), key)
+        except (OSError, KeyError, ValueError):
+            pass
+        index = cls.build(bounds, resolution, gamma, joint_limits)
+        index.save(path)
+        return index
+
+    def save(self, path=index_path):
+        try:
+            np.savez_compressed(path, bits=np.packbits(self.grid.ravel()), shape=np.array(self.grid.shape),
+                                origin=self.origin, resolution=self.resolution, key=self.key)
+        except OSError as e:
+            print(f"Could not write reachability index {path}: {e}")
+
+    def contains(self, points):
+        # (N, 3) or (3,) -> bool array / bool; points outside the box are unreachable
+        points = np.asarray(points, dtype=np.float64)
+        single = points.ndim == 1
+        points = points.reshape(-1, 3)
+        idx = np.floor((points - self.origin) / self.resolution).astype(np.int64)
+        inside = np.all((idx >= 0) & (idx < self.grid.shape), axis=1)
+        result = np.zeros(len(points), dtype=bool)
+        i = idx[inside]
+        result[inside] = self.grid[i[:, 0], i[:, 1], i[:, 2]]
+        return bool(result[0]) if single else result
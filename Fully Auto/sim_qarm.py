@@ -0,0 +1,195 @@
+# sim_qarm.py
+# Hardware-free stand-ins for pal.products.qarm.QArm / QArmRealSense and
+# hal.products.qarm.QArmUtilities, so the sorter can run and be benchmarked on
+# machines without the Quanser stack. Select them with QARM_BACKEND=sim (see
+# qarm_backend.py).
+#
+# Joint dynamics: each joint moves toward its command as a first-order system
+# with time constant `time_constant`, rate-limited to `max_speed`. Every
+# read_write_std() call also costs `io_latency` (+ seeded jitter), like a HIL
+# round trip. Camera frames are replayed from image files (QARM_SIM_IMAGES) or
+# generated from a seeded RNG, so runs are repeatable.
+
+import os
+import glob
+import time
+import numpy as np
+import cv2
+import qarm_kinematics
+
+class SimQArmUtilities:
+    # Same call signatures as hal.products.qarm.QArmUtilities
+    def qarm_forward_kinematics(self, phi):
+        phi = np.asarray(phi, dtype=np.float64)
+        phi1, phi2, phi3 = phi[0], phi[1], phi[2]
+        phi4 = phi[3] if len(phi) > 3 else 0.0
+        pitch = phi2 + phi3
+        p4 = qarm_kinematics.forward_kinematics(np.array([phi1, phi2, phi3, phi4]))
+
+        c1, s1 = np.cos(phi1), np.sin(phi1)
+        cp, sp = np.cos(pitch), np.sin(pitch)
+        c4, s4 = np.cos(phi4), np.sin(phi4)
+        Rz = np.array([[c1, -s1, 0], [s1, c1, 0], [0, 0, 1]])
+        Ry = np.array([[cp, 0, sp], [0, 1, 0], [-sp, 0, cp]])
+        Rx = np.array([[1, 0, 0], [0, c4, -s4], [0, s4, c4]])
+        return p4, Rz @ Ry @ Rx
+
+    def qarm_inverse_kinematics(self, p, gamma, phiPrev):
+        # Returns (allPhi, phiCmd): the 4 candidate solutions (rows) and the
+        # valid one closest to phiPrev, preferring solutions inside the joint
+        # limits (NaNs if the point is unreachable)
+        allPhi = qarm_kinematics.inverse_kinematics(np.asarray(p, dtype=np.float64)[0:3], gamma)
+        phiCmd = qarm_kinematics.select_solution(allPhi, phiPrev)
+        return allPhi[0], phiCmd[0]
+
+class SimQArm:
+    def __init__(self, hardware=0, readMode=0, frequency=500, max_speed=None, time_constant=0.05,
+                 io_latency=0.0005, io_jitter=0.0, seed=0, **kwargs):
+        self.max_speed = np.array([1.5, 1.5, 1.5, 2.0, 2.0]) if max_speed is None else np.asarray(max_speed, dtype=np.float64)
+        self.time_constant = time_constant
+        self.io_latency = io_latency
+        self.io_jitter = io_jitter
+        self._rng = np.random.default_rng(seed)
+
+        self.status = True
+        self.measJointPosition = np.zeros(5)
+        self.measJointSpeed = np.zeros(5)
+        self.measJointCurrent = np.zeros(5)
+        self.measJointPWM = np.zeros(5)
+        self.measJointTemperature = np.full(5, 25.0)
+        self._cmd = np.zeros(5)
+        self._last = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.terminate()
+
+    def _advance(self):
+        now = time.perf_counter()
+        dt = now - self._last
+        self._last = now
+        # Integrate in <=1 ms steps so long gaps between calls stay accurate
+        steps = max(1, min(int(np.ceil(dt / 0.001)), 10000))
+        h = dt / steps
+        q = self.measJointPosition
+        for _ in range(steps):
+            v = np.clip((self._cmd - q) / self.time_constant, -self.max_speed, self.max_speed)
+            q = q + v * h
+        self.measJointSpeed = (q - self.measJointPosition) / dt if dt > 0 else np.zeros(5)
+        self.measJointPosition = q
+
+    def _io_delay(self):
+        delay = self.io_latency + (self.io_jitter * abs(self._rng.standard_normal()) if self.io_jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def read_write_std(self, phiCMD=None, gprCMD=None, baseLED=None):
+        self._advance()
+        if phiCMD is not None:
+            self._cmd[0:4] = np.asarray(phiCMD, dtype=np.float64)[0:4]
+        if gprCMD is not None:
+            self._cmd[4] = float(gprCMD)
+        self._io_delay()
+
+    def read_std(self):
+        self._advance()
+        self._io_delay()
+
+    def terminate(self):
+        self.status = False
+
+class ImageSource:
+    # Replays image files in sorted order (looping), or synthesises frames
+    def __init__(self, pattern=None, width=640, height=480, seed=0, depth=0.45):
+        self.width = width
+        self.height = height
+        self.depth = depth
+        self.paths = []
+        if pattern:
+            if os.path.isdir(pattern):
+                pattern = os.path.join(pattern, "*")
+            self.paths = sorted(p for p in glob.glob(pattern)
+                                if p.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')))
+        self._rng = np.random.default_rng(seed)
+        self._index = 0
+
+    def next(self):
+        # Returns (BGR uint8 frame, depth in metres)
+        if self.paths:
+            path = self.paths[self._index % len(self.paths)]
+            self._index += 1
+            rgb = cv2.resize(cv2.imread(path), (self.width, self.height))
+            depth_path = os.path.splitext(path)[0] + "_depth.npy"
+            if os.path.isfile(depth_path):
+                depth = cv2.resize(np.load(depth_path).astype(np.float32), (self.width, self.height))
+            else:
+                depth = np.full((self.height, self.width), self.depth, dtype=np.float32)
+            return rgb, depth
+        return self._synthetic()
+
+    def _synthetic(self):
+        # Yellow ellipse ("banana") at a random pose on a grey table, 4 cm above it in depth
+        rgb = np.full((self.height, self.width, 3), 90, dtype=np.uint8)
+        depth = np.full((self.height, self.width), self.depth, dtype=np.float32)
+        cx = int(self.width / 2 + self._rng.uniform(-60, 60))
+        cy = int(self.height / 2 + self._rng.uniform(-40, 40))
+        angle = float(self._rng.uniform(0, 180))
+        axes = (int(self._rng.uniform(70, 110)), int(self._rng.uniform(20, 35)))
+        cv2.ellipse(rgb, (cx, cy), axes, angle, 0, 360, (0, 220, 230), -1)
+        mask = np.zeros((self.height, self.width), dtype=np.uint8)
+        cv2.ellipse(mask, (cx, cy), axes, angle, 0, 360, 255, -1)
+        depth[mask > 0] = self.depth - 0.04
+        return rgb, depth
+
+# Distance (m) shown as white in the 8-bit depth image (approximate)
+depth_px_range = 10.0
+
+class SimQArmRealSense:
+    def __init__(self, mode='RGB&DEPTH', hardware=0, deviceID=0, frameWidthRGB=640, frameHeightRGB=480,
+                 frameRateRGB=30.0, frameWidthDepth=640, frameHeightDepth=480, frameRateDepth=30.0,
+                 readMode=0, source=None, seed=0, **kwargs):
+        self.mode = mode
+        self.readMode = readMode
+        self.frameRate = frameRateRGB
+        self.source = source or ImageSource(os.environ.get("QARM_SIM_IMAGES"), frameWidthRGB, frameHeightRGB, seed)
+        self.imageBufferRGB = np.zeros((frameHeightRGB, frameWidthRGB, 3), dtype=np.uint8)
+        # Same buffers as the real class: an 8-bit image for display and depth in metres
+        self.imageBufferDepthPX = np.zeros((frameHeightDepth, frameWidthDepth, 1), dtype=np.uint8)
+        self.imageBufferDepthM = np.zeros((frameHeightDepth, frameWidthDepth, 1), dtype=np.float32)
+        self._frame_rgb, self._frame_depth = self.source.next()
+        # RGB and depth are separate streams, each delivering one frame per period
+        self._next_frame = {"rgb": time.perf_counter(), "depth": time.perf_counter()}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.terminate()
+
+    def _wait_frame(self, stream):
+        # readMode=1 blocks until the stream's next frame period, like the real sensor
+        if self.readMode == 1:
+            delay = self._next_frame[stream] - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_frame[stream] = max(self._next_frame[stream], time.perf_counter()) + 1.0 / self.frameRate
+
+    def read_RGB(self):
+        self._wait_frame("rgb")
+        self._frame_rgb, self._frame_depth = self.source.next()
+        self.imageBufferRGB[...] = self._frame_rgb
+        return time.perf_counter()
+
+    def read_depth(self, dataMode='PX'):
+        # dataMode 'PX' fills imageBufferDepthPX, 'M' fills imageBufferDepthM
+        self._wait_frame("depth")
+        if dataMode == 'M':
+            self.imageBufferDepthM[..., 0] = self._frame_depth
+        else:
+            self.imageBufferDepthPX[..., 0] = np.clip(self._frame_depth * (255.0 / depth_px_range), 0, 255).astype(np.uint8)
+        return time.perf_counter()
+
+    def terminate(self):
+        pass
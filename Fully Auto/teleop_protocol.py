@@ -0,0 +1,63 @@
+# teleop_protocol.py
+# Binary UDP packets shared by teleop_server.py and teleop_client.py.
+# Little-endian, fixed size, one command or state sample per datagram.
+#
+#   Command (client -> server, 56 bytes)
+#     magic "QT", version, kind, seq (uint32), sent (client perf_counter),
+#     values[4] (joint angles rad, or x y z gamma), gripper (NaN = keep)
+#   State (server -> client, 69 bytes)
+#     magic "QT", version, kind=STATE, seq, ack (seq of the last applied command),
+#     flags, echo (its `sent`), applied (server perf_counter when it was sent to
+#     the arm), measJointPosition[5]
+#
+# perf_counter is a system-wide monotonic clock on Linux and Windows, so on one
+# machine `applied - sent` is the one-way command latency.
+
+import struct
+
+MAGIC = b"QT"
+VERSION = 1
+default_port = 9109
+
+# Command kinds
+JOINT = 1
+TASK = 2
+GRIPPER = 3
+HEARTBEAT = 4
+# State kind
+STATE = 10
+
+# State flags
+FLAG_DEADMAN = 1      # no command within the dead-man timeout; arm is holding position
+FLAG_REJECTED = 2     # the last task-space command had no valid IK solution
+
+COMMAND = struct.Struct("<2sBBId4dd")
+STATE_PACKET = struct.Struct("<2sBBIIBdd5d")
+
+def pack_command(kind, seq, sent, values=(0.0, 0.0, 0.0, 0.0), gripper=float("nan")):
+    return COMMAND.pack(MAGIC, VERSION, kind, seq & 0xFFFFFFFF, sent, *values, gripper)
+
+def unpack_command(data):
+    # (kind, seq, sent, values, gripper), or None for a malformed packet
+    if len(data) != COMMAND.size:
+        return None
+    magic, version, kind, seq, sent, v0, v1, v2, v3, gripper = COMMAND.unpack(data)
+    if magic != MAGIC or version != VERSION or kind not in (JOINT, TASK, GRIPPER, HEARTBEAT):
+        return None
+    return kind, seq, sent, (v0, v1, v2, v3), gripper
+
+def pack_state(seq, ack, flags, echo, applied, joints):
+    return STATE_PACKET.pack(MAGIC, VERSION, STATE, seq & 0xFFFFFFFF, ack & 0xFFFFFFFF, flags, echo, applied, *joints)
+
+def unpack_state(data):
+    # (seq, ack, flags, echo, applied, joints), or None
+    if len(data) != STATE_PACKET.size:
+        return None
+    magic, version, kind, seq, ack, flags, echo, applied, *joints = STATE_PACKET.unpack(data)
+    if magic != MAGIC or version != VERSION or kind != STATE:
+        return None
+    return seq, ack, flags, echo, applied, joints
+
+def newer(seq, last):
+    # uint32 sequence comparison that survives wrap-around
+    return 0 < ((seq - last) & 0xFFFFFFFF) < 0x80000000
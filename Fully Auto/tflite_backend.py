@@ -0,0 +1,53 @@
+# tflite_backend.py
+# Runs a .tflite export of the fruit model (see export_model.py) behind the same
+# predict_on_batch interface as the Keras model, so fruit_ident, the inference
+# server and the TestML scripts can use either. Uses the standalone TFLite
+# runtime when installed (no TensorFlow import), otherwise tf.lite.
+
+import os
+import numpy as np
+
+def _interpreter_class():
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+class TFLiteModel:
+    def __init__(self, path, num_threads=None):
+        self.path = path
+        self.interpreter = _interpreter_class()(model_path=path, num_threads=num_threads or os.cpu_count())
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch = int(self.input["shape"][0])
+
+    def _resize(self, n):
+        # Tensors are reallocated only when the batch size changes
+        if n != self.batch:
+            self.interpreter.resize_tensor_input(self.input["index"], [n, *self.input["shape"][1:]])
+            self.interpreter.allocate_tensors()
+            self.input = self.interpreter.get_input_details()[0]
+            self.output = self.interpreter.get_output_details()[0]
+            self.batch = n
+
+    def predict_on_batch(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        self._resize(len(x))
+        scale, zero_point = self.input["quantization"]
+        if self.input["dtype"] != np.float32:
+            # Fully integer model: quantise the [0, 1] input with the calibrated scale
+            info = np.iinfo(self.input["dtype"])
+            x = np.clip(np.round(x / scale + zero_point), info.min, info.max).astype(self.input["dtype"])
+        self.interpreter.set_tensor(self.input["index"], x)
+        self.interpreter.invoke()
+        y = self.interpreter.get_tensor(self.output["index"])
+        scale, zero_point = self.output["quantization"]
+        if self.output["dtype"] != np.float32:
+            y = (y.astype(np.float32) - zero_point) * scale
+        return np.array(y, dtype=np.float32)
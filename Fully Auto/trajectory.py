@@ -0,0 +1,86 @@
+# trajectory.py
+# Time-parameterised joint-space trajectories for the QArm. A route through N
+# waypoints is split into rest-to-rest segments; each segment follows a
+# trapezoidal velocity profile along the straight line in joint space, timed by
+# whichever joint hits its velocity/acceleration limit first (time-optimal for
+# a synchronised straight-line move). Planning and sampling are vectorised over
+# segments and samples, and stream() sends the set-points at a fixed rate.
+
+import time
+import numpy as np
+
+# === Limits (rad/s, rad/s^2) - conservative defaults, tune on the real arm ===
+max_velocity = np.array([1.0, 1.0, 1.0, 1.5])
+max_acceleration = np.array([2.0, 2.0, 2.0, 4.0])
+stream_rate = 500.0  # Hz
+
+class Trajectory:
+    def __init__(self, waypoints, v_max=max_velocity, a_max=max_acceleration):
+        self.waypoints = np.atleast_2d(np.asarray(waypoints, dtype=np.float64))
+        if len(self.waypoints) < 2:
+            self.waypoints = np.vstack([self.waypoints, self.waypoints])
+        self.delta = np.diff(self.waypoints, axis=0)                      # (segments, joints)
+        dist = np.abs(self.delta)
+
+        # Limits on the path parameter s in [0, 1] for each segment
+        with np.errstate(divide='ignore'):
+            v_s = np.min(np.where(dist > 0, v_max / np.maximum(dist, 1e-12), np.inf), axis=1)
+            a_s = np.min(np.where(dist > 0, a_max / np.maximum(dist, 1e-12), np.inf), axis=1)
+        moving = np.isfinite(v_s)
+        v_s = np.where(moving, v_s, 1.0)
+        a_s = np.where(moving, a_s, 1.0)
+
+        # Triangular profile when the cruise speed can't be reached within the segment
+        triangular = v_s * v_s / a_s >= 1.0
+        t_acc = np.where(triangular, np.sqrt(1.0 / a_s), v_s / a_s)
+        v_peak = np.where(triangular, a_s * t_acc, v_s)
+        duration = np.where(triangular, 2.0 * t_acc, 1.0 / v_s + v_s / a_s)
+
+        self.accel = np.where(moving, a_s, 0.0)
+        self.t_acc = np.where(moving, t_acc, 0.0)
+        self.v_peak = np.where(moving, v_peak, 0.0)
+        self.durations = np.where(moving, duration, 0.0)
+        self.ends = np.cumsum(self.durations)
+        self.starts = self.ends - self.durations
+        self.duration = float(self.ends[-1])
+
+    def sample(self, t):
+        # Joint positions at times t (scalar or array, seconds from the start)
+        t = np.atleast_1d(np.asarray(t, dtype=np.float64))
+        seg = np.minimum(np.searchsorted(self.ends, t, side='right'), len(self.durations) - 1)
+        T = self.durations[seg]
+        tau = np.clip(t - self.starts[seg], 0.0, T)
+        a = self.accel[seg]
+        ta = self.t_acc[seg]
+
+        s = np.where(
+            tau < ta, 0.5 * a * tau ** 2,
+            np.where(tau < T - ta, 0.5 * a * ta ** 2 + self.v_peak[seg] * (tau - ta),
+                     1.0 - 0.5 * a * (T - tau) ** 2)
+        )
+        s = np.where(T > 0, np.clip(s, 0.0, 1.0), 1.0)
+        return self.waypoints[seg] + s[:, None] * self.delta[seg]
+
+    def setpoints(self, rate=stream_rate):
+        # Uniformly spaced set-points, always ending exactly on the last waypoint
+        t = np.append(np.arange(0.0, self.duration, 1.0 / rate), self.duration)
+        return t, self.sample(t)
+
+def stream(myArm, trajectory, gripCmd, led_cmd, rate=stream_rate):
+    # Send the set-points through read_write_std at a fixed rate. If a tick
+    # overruns, jump to the set-point for the current time instead of lagging.
+    _, points = trajectory.setpoints(rate)
+    period = 1.0 / rate
+    last = len(points) - 1
+    start = time.perf_counter()
+    i = 0
+    while True:
+        myArm.read_write_std(phiCMD=points[i], gprCMD=gripCmd, baseLED=led_cmd)
+        if i == last:
+            break
+        # Set-point i is due at i * period
+        i = min(max(i + 1, int((time.perf_counter() - start) / period)), last)
+        delay = start + i * period - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    return time.perf_counter() - start
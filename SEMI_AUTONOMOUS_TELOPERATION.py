@@ -7,12 +7,17 @@ import numpy as np
 import time
 import pygame
 
-# Add the path to the QArm libraries and the IK script
-sys.path.append(r"C:\Users\hitis\Documents\Quanser\0_libraries\python")
-sys.path.append(r"C:\Users\hitis\Documents\Quanser\5_research\qarm\basic")
+# Shared modules; qarm_backend adds the QArm library paths (or the simulator with QARM_BACKEND=sim)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Fully Auto"))
 
-from pal.products.qarm import QArm
-from hal.products.qarm import QArmUtilities
+from qarm_backend import QArm, QArmUtilities
+from pose_registry import PoseRegistry, cache_path_for, within_limits
+from qarm_kinematics import ReachabilityIndex, JOINT_LIMITS
+
+# Workspace box (m); z >= 0 keeps targets above the table
+x_limit = (-0.8, 0.8)
+y_limit = (-0.8, 0.8)
+z_limit = (0.0, 0.8)
 
 def print_instructions():
     print(
@@ -23,15 +28,16 @@ def print_instructions():
         "- Press 'o' to open the gripper\n"
         "- Press 'q' to continue\n"
         "--------------------------------------------\n"
-        "Joint angle limits (rad): J1: [-π, π], J2: [-π/2, π/2], J3: [0, π], J4: [-π/2, π/2]\n"
-        "Workspace limits (approx): x: (-0.8, 0.8), y: (-0.8, 0.8), z: (0.0, 0.8)\n"
+        "Joint angle limits (deg): " + ", ".join(
+            f"J{i + 1}: [{lo:.0f}, {hi:.0f}]" for i, (lo, hi) in enumerate(np.rad2deg(JOINT_LIMITS))) + "\n"
+        f"Workspace limits: x: {x_limit}, y: {y_limit}, z: {z_limit}\n"
+        "Coordinates must also be reachable within the joint limits (1 cm voxel check)\n"
     )
 
-def validate_coordinates(x, y, z):
-    x_limit = (-0.8, 0.8)
-    y_limit = (-0.8, 0.8)
-    z_limit = (0.0, 0.8)
-    return x_limit[0] <= x <= x_limit[1] and y_limit[0] <= y <= y_limit[1] and z_limit[0] <= z <= z_limit[1]
+def validate_coordinates(x, y, z, reach):
+    # Workspace box (table floor included), then an O(1) lookup in the reachability grid
+    in_box = x_limit[0] <= x <= x_limit[1] and y_limit[0] <= y <= y_limit[1] and z_limit[0] <= z <= z_limit[1]
+    return in_box and reach.contains(np.array([x, y, z]))
 
 def check_ik_solution_validity(phiCmd):
     return not np.any(np.isnan(phiCmd))
@@ -89,8 +95,14 @@ def main():
         "home": [0.40, 0, 0.30]
     }
 
+    gamma = 0
+    myArmUtilities = QArmUtilities()
+    # Solve IK for the predefined positions once; fails here if any of them is unreachable
+    registry = PoseRegistry(positions, myArmUtilities, gamma, cache_path_for("teleop"))
+    # Built once (a few seconds) and cached next to the shared modules
+    reach = ReachabilityIndex.load_or_build(gamma=gamma)
+
     with QArm(hardware=0) as myArm:
-        myArmUtilities = QArmUtilities()
         gripCmd = 0.0
 
         while myArm.status:
@@ -102,6 +114,7 @@ def main():
                 pos_choice = input("Enter position name: ").strip()
                 if pos_choice in positions:
                     positionCmd = np.array(positions[pos_choice])
+                    phiCmd = registry.joints(pos_choice)
                 else:
                     print("Invalid position. Try again.")
                     continue
@@ -112,19 +125,22 @@ def main():
                         print("Enter exactly 3 values.")
                         continue
                     x, y, z = map(float, coords)
-                    if not validate_coordinates(x, y, z):
-                        print("Coordinates out of bounds.")
+                    if not validate_coordinates(x, y, z, reach):
+                        print("Coordinates out of reach.")
                         continue
                     positionCmd = np.array([x, y, z])
                 except ValueError:
                     print("Invalid input.")
                     continue
 
-            gamma = 0
-            allPhi, phiCmd = myArmUtilities.qarm_inverse_kinematics(positionCmd, gamma, myArm.measJointPosition[0:4])
-            if not check_ik_solution_validity(phiCmd):
-                print("Unreachable position.")
-                continue
+                allPhi, phiCmd = myArmUtilities.qarm_inverse_kinematics(positionCmd, gamma, myArm.measJointPosition[0:4])
+                if not check_ik_solution_validity(phiCmd):
+                    print("Unreachable position.")
+                    continue
+                # The chosen IK branch can still break a joint limit inside the reachable volume
+                if not within_limits(phiCmd, JOINT_LIMITS):
+                    print(f"Joint limits exceeded: {np.around(np.rad2deg(phiCmd), 1)} deg")
+                    continue
 
             location, _ = myArmUtilities.qarm_forward_kinematics(np.append(phiCmd, gamma))
             phiCmd_deg = np.rad2deg(phiCmd)
@@ -3,10 +3,9 @@ from pathlib import Path
 from PIL import Image
 import numpy as np
 import pandas as pd
-import tensorflow as tf
-from keras.models import load_model
-from keras.utils import img_to_array
 import matplotlib.pyplot as plt
+from eval_pipeline import list_images, predict_stream, PreprocessCache
+import fruit_ident  # FRUIT_IDENT_BACKEND=server uses the running inference server instead of loading TensorFlow here
 
 # === Paths ===
 image_dir = Path(r"C:\Users\hitis\Desktop\Applied Robotics\Report\Codes\TestML\ripe_T")
@@ -14,55 +13,44 @@ model_path = r"C:\Users\hitis\Desktop\Applied Robotics\Report\Codes\Fully Auto\b
 output_excel = Path(r"C:\Users\hitis\Desktop\Applied Robotics\Report\Codes\TestML\MLtest.xlsx")
 
 # === Constants ===
-target_size = (224, 224)
+batch_size = 32
 true_fruit, true_ripeness = "tomato", "ripe"
 class_names = [
-    'banana_ripeness_ripe', 'banana_ripeness_unripe', 'banana_ripeness_rotten',
-    'tomato_ripeness_ripe', 'tomato_ripeness_unripe', 'tomato_ripeness_rotten',
-    'strawberry_ripeness_ripe', 'strawberry_ripeness_unripe', 'strawberry_ripeness_rotten'
+    # Same (alphabetical) order as class_labels in fruit_ident.py, which the model was trained with
+    'banana_ripeness_ripe', 'banana_ripeness_rotten', 'banana_ripeness_unripe',
+    'strawberry_ripeness_ripe', 'strawberry_ripeness_rotten', 'strawberry_ripeness_unripe',
+    'tomato_ripeness_ripe', 'tomato_ripeness_rotten', 'tomato_ripeness_unripe'
 ]
 
-# === Step 1: Resize images ===
-print("Resizing all images...")
-for img_path in image_dir.glob("*.jpg"):
-    try:
-        img = Image.open(img_path).convert("RGB")
-        img = img.resize(target_size)
-        img.save(img_path)
-    except Exception as e:
-        print(f"Failed to resize {img_path.name}: {e}")
-
-# === Step 2: Load model ===
+# === Step 1: Load model ===
 print("Loading model...")
-model = load_model(model_path)
+fruit_ident.model_path = model_path
+model = fruit_ident.get_model()
 
-# === Step 3: Run predictions ===
+# === Step 2: Run predictions ===
 results = []
 print("Predicting images...\n")
-for idx, img_path in enumerate(list(image_dir.glob("*.jpg"))[:181], start=1):
-    try:
-        img = Image.open(img_path).convert("RGB")
-        img = img.resize(target_size)
-        img_array = img_to_array(img) / 255.0
-        img_array = np.expand_dims(img_array, axis=0)
-
-        pred = model.predict(img_array, verbose=0)
-        label_idx = np.argmax(pred)
-        label = class_names[label_idx]
-        confidence = float(np.max(pred))
-
-        predicted_fruit, predicted_ripeness = label.split('_ripeness_')
+cache = PreprocessCache()  # decoded tensors are reused on the next run
+valid_image_paths = list_images(image_dir, suffixes=(".jpg",), limit=181)
+idx = 0
+for batch_paths, probs, errors in predict_stream(model, valid_image_paths, batch_size=batch_size, cache=cache):
+    for img_path, error in errors:
+        idx += 1
+        print(f"[{idx}] Error with {img_path.name}: {error}")
+    # Originals are decoded at model resolution in memory; nothing is written back to disk
+    label_idx = probs.argmax(axis=1)
+    confidence = probs.max(axis=1)
+    for img_path, i, conf in zip(batch_paths, label_idx, confidence):
+        idx += 1
+        predicted_fruit, predicted_ripeness = class_names[i].split('_ripeness_')
         misclassified = int((predicted_fruit != true_fruit) or (predicted_ripeness != true_ripeness))
 
         results.append([
-            img_path.name, predicted_fruit, predicted_ripeness, f"{confidence:.2f}",
+            img_path.name, predicted_fruit, predicted_ripeness, f"{conf:.2f}",
             true_fruit, true_ripeness, misclassified
         ])
 
-    except Exception as e:
-        print(f"[{idx}] Error with {img_path.name}: {e}")
-
-# === Step 4: Save to Excel ===
+# === Step 3: Save to Excel ===
 df = pd.DataFrame(results, columns=[
     "Image", "Predicted_Fruit", "Predicted_Ripeness", "Confidence",
     "True_Fruit", "True_Ripeness", "Misclassified"
@@ -71,7 +59,7 @@ df["Misclassified"] = df["Misclassified"].astype(int)
 df.to_excel(output_excel, index=False)
 print(f"\n✅ Excel updated: {output_excel}")
 
-# === Step 5: Visualize misclassified images ===
+# === Step 4: Visualize misclassified images ===
 def show_misclassified_images(df, base_path, num=5):
     print(f"\n🔍 Showing {num} misclassified images...\n")
     misclassified_df = df[df["Misclassified"] == 1]
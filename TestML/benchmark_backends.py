@@ -0,0 +1,152 @@
+# benchmark_backends.py
+# Side-by-side comparison of inference backends on the same class-per-folder
+# dataset (layout as in evaluate_all.py): the Keras model and the TFLite exports
+# from Fully Auto/export_model.py. For each backend it reports load time, file
+# size, per-image latency percentiles, peak memory, accuracy and the per-class
+# accuracy change against the first backend (the reference), so the fastest
+# backend that keeps accuracy can be picked for FRUIT_IDENT_BACKEND.
+#
+# Each backend runs in its own process so memory figures don't overlap.
+#
+# An int8 export calibrated on images from this dataset has seen them while its
+# activation ranges were fitted, so its accuracy here is optimistic; calibrate on
+# a separate set (export_model.py --calibration-dir) for a fair comparison.
+#
+#   python benchmark_backends.py --dataset "C:\...\TestML\dataset"
+#   python benchmark_backends.py --backends keras "C:\...\best_model_int8.tflite" --batch-size 8
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from evaluate_all import dataset_dir, scan_dataset, predict_paths, latency_stats, class_labels
+from eval_pipeline import PreprocessCache
+import fruit_ident
+
+output_excel = r"C:\Users\hitis\Desktop\Applied Robotics\Report\Codes\TestML\MLtest_backends.xlsx"
+n_classes = len(class_labels)
+
+def default_backends(model_path=fruit_ident.model_path):
+    found = ["keras"]
+    for mode in ("dynamic", "int8", "float16"):
+        path = os.path.splitext(model_path)[0] + f"_{mode}.tflite"
+        if os.path.exists(path):
+            found.append(path)
+    return found
+
+def peak_rss_mb():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1e6 if sys.platform == "darwin" else 1e3)
+    except ImportError:
+        # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1e6
+
+def run_backend(spec, model_path, paths, batch_size, use_tensor_cache):
+    # Runs in a fresh process: load one backend, predict every image, report
+    baseline = peak_rss_mb()
+    if spec == "keras":
+        fruit_ident.backend, fruit_ident.model_path = "local", model_path
+        file_mb = os.path.getsize(model_path) / 1e6
+    else:
+        fruit_ident.backend, fruit_ident.tflite_path = "tflite", spec
+        file_mb = os.path.getsize(spec) / 1e6
+    t0 = time.perf_counter()
+    model = fruit_ident.get_model()
+    load_s = time.perf_counter() - t0
+    loaded = peak_rss_mb()
+    tensor_cache = PreprocessCache() if use_tensor_cache else None
+    ok_paths, probs, latency, errors = predict_paths(model, paths, batch_size, tensor_cache)
+    return {
+        "ok_paths": [str(p) for p in ok_paths], "probs": probs, "latency": latency, "errors": len(errors),
+        "load_s": load_s, "file_mb": file_mb, "load_mb": loaded - baseline, "peak_mb": peak_rss_mb() - baseline
+    }
+
+def per_class_accuracy(labels, predicted):
+    support = np.bincount(labels, minlength=n_classes)
+    correct = np.bincount(labels[labels == predicted], minlength=n_classes)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return correct / support
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare inference backends on one dataset")
+    parser.add_argument("--dataset", default=dataset_dir)
+    parser.add_argument("--model", default=fruit_ident.model_path, help="Keras model (the 'keras' backend)")
+    parser.add_argument("--backends", nargs="+", default=None,
+                        help="'keras' and/or .tflite paths; the first is the reference (default: keras + exports found next to the model)")
+    parser.add_argument("--batch-size", type=int, default=1, help="1 matches Full_auto's one fruit per cycle")
+    parser.add_argument("--out", default=output_excel, help="Excel report path ('' to skip)")
+    parser.add_argument("--no-tensor-cache", action="store_true")
+    args = parser.parse_args()
+
+    backends = args.backends or default_backends(args.model)
+    paths, labels = scan_dataset(args.dataset)
+    if not paths:
+        print(f"No images found under {args.dataset}")
+        return
+    label_of = dict(zip(map(str, paths), labels))
+    print(f"{len(paths)} images, backends: {', '.join(os.path.basename(b) for b in backends)}")
+    if any("int8" in os.path.basename(b) for b in backends):
+        print("Note: int8 accuracy is optimistic if its calibration images came from this dataset.")
+
+    results = {}
+    for spec in backends:
+        print(f"\n--- {spec} ---")
+        # spawn: a clean interpreter per backend, so TensorFlow and memory don't carry over
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results[spec] = pool.submit(run_backend, spec, args.model, paths, args.batch_size,
+                                        not args.no_tensor_cache).result()
+
+    # Compare on the images every backend could read
+    common = set.intersection(*(set(r["ok_paths"]) for r in results.values()))
+    reference = backends[0]
+    summary, per_class = [], {}
+    for spec in backends:
+        r = results[spec]
+        keep = np.array([p in common for p in r["ok_paths"]], dtype=bool)
+        order = np.argsort(np.array(r["ok_paths"])[keep])
+        r["probs"], r["latency"] = r["probs"][keep][order], r["latency"][keep][order]
+        r["labels"] = np.array([label_of[p] for p in np.array(r["ok_paths"])[keep][order]], dtype=np.int64)
+        r["predicted"] = r["probs"].argmax(axis=1)
+
+    ref = results[reference]
+    for spec in backends:
+        r = results[spec]
+        stats = latency_stats(r["latency"])
+        per_class[os.path.basename(spec)] = per_class_accuracy(r["labels"], r["predicted"])
+        summary.append({
+            "Backend": os.path.basename(spec), "File_MB": r["file_mb"], "Load_s": r["load_s"],
+            "Memory_after_load_MB": r["load_mb"], "Peak_memory_MB": r["peak_mb"],
+            **stats, "Images_per_s": 1.0 / r["latency"].mean() if r["latency"].size else float("nan"),
+            "Accuracy": float(np.mean(r["predicted"] == r["labels"])),
+            "Accuracy_delta": float(np.mean(r["predicted"] == r["labels"]) - np.mean(ref["predicted"] == ref["labels"])),
+            "Agreement_with_reference": float(np.mean(r["predicted"] == ref["predicted"])),
+            "Max_prob_diff": float(np.abs(r["probs"] - ref["probs"]).max()) if len(common) else float("nan"),
+            "Errors": r["errors"]
+        })
+
+    summary = pd.DataFrame(summary)
+    accuracy = pd.DataFrame(per_class, index=class_labels)
+    delta = accuracy.sub(accuracy.iloc[:, 0], axis=0)
+    print(f"\n{len(common)} images compared, reference: {os.path.basename(reference)}\n")
+    print(summary.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print("\nPer-class accuracy:")
+    print(accuracy.to_string(float_format=lambda v: f"{v:.3f}"))
+    print("\nPer-class accuracy delta vs reference:")
+    print(delta.to_string(float_format=lambda v: f"{v:+.3f}"))
+
+    if args.out:
+        with pd.ExcelWriter(args.out) as writer:
+            summary.to_excel(writer, sheet_name="Summary", index=False)
+            accuracy.to_excel(writer, sheet_name="Per class accuracy")
+            delta.to_excel(writer, sheet_name="Per class delta")
+        print(f"\n✅ Excel saved: {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# eval_pipeline.py
+# Streaming input pipeline for model evaluation. Images are decoded and resized
+# by a pool of worker threads (PIL releases the GIL while decoding), JPEGs use
+# PIL draft mode so they are decoded directly at reduced scale, finished batches
+# are prefetched into a bounded queue, and inference runs once per batch.
+# Source images are only read, never rewritten. With a PreprocessCache, decoded
+# tensors are reused across runs keyed by file content.
+
+import os
+import sys
+import queue
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Fully Auto"))
+from preprocess_cache import PreprocessCache
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg")
+target_size = (224, 224)
+
+def list_images(image_dir, suffixes=IMAGE_SUFFIXES, limit=None):
+    paths = sorted(p for p in Path(image_dir).glob("*.*") if p.suffix.lower() in suffixes)
+    return paths[:limit] if limit is not None else paths
+
+def load_image(path, size=target_size):
+    # Decode one image to a (H, W, 3) uint8 array at `size`
+    with Image.open(path) as img:
+        if img.format == "JPEG":
+            # Let the JPEG decoder downscale by 1/2, 1/4 or 1/8 while staying >= size
+            img.draft("RGB", size)
+        img = img.convert("RGB")
+        if img.size != size:
+            img = img.resize(size)
+        return np.asarray(img, dtype=np.uint8)
+
+def _decode(path, size, cache):
+    try:
+        if cache is not None:
+            params = {"size": size, "resize": "draft+pil_default", "dtype": "uint8"}
+            return cache.get(path, params, lambda p: load_image(p, size)), None
+        return load_image(path, size), None
+    except Exception as e:
+        return None, e
+
+def stream_batches(paths, batch_size=32, workers=None, prefetch=4, size=target_size, cache=None):
+    # Yields (batch_paths, uint8 batch array, errors) in input order, where
+    # errors is a list of (path, exception) for images that failed to decode
+    paths = list(paths)
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    ready = queue.Queue(maxsize=prefetch)
+    done = object()
+    stop = threading.Event()
+
+    def producer(pool):
+        try:
+            for start in range(0, len(paths), batch_size):
+                if stop.is_set():
+                    break
+                chunk = paths[start:start + batch_size]
+                futures = [pool.submit(_decode, p, size, cache) for p in chunk]
+                batch = np.empty((len(chunk), size[1], size[0], 3), dtype=np.uint8)
+                ok_paths, errors, n = [], [], 0
+                for path, future in zip(chunk, futures):
+                    array, error = future.result()
+                    if error is not None:
+                        errors.append((path, error))
+                        continue
+                    batch[n] = array
+                    ok_paths.append(path)
+                    n += 1
+                ready.put((ok_paths, batch[:n], errors))
+        finally:
+            ready.put(done)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decode") as pool:
+        thread = threading.Thread(target=producer, args=(pool,), name="BatchProducer", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = ready.get()
+                if item is done:
+                    break
+                yield item
+        finally:
+            stop.set()
+            # Unblock the producer if the consumer stopped early
+            while thread.is_alive():
+                try:
+                    ready.get_nowait()
+                except queue.Empty:
+                    thread.join(0.05)
+
+def to_model_input(batch):
+    # uint8 (N, H, W, 3) -> float32 in [0, 1], as used in training
+    x = batch.astype(np.float32)
+    x *= 1.0 / 255.0
+    return x
+
+def predict_stream(model, paths, batch_size=32, workers=None, prefetch=4, size=target_size, cache=None):
+    # Yields (batch_paths, probabilities, errors); one forward pass per batch
+    for batch_paths, batch, errors in stream_batches(paths, batch_size, workers, prefetch, size, cache):
+        probs = np.asarray(model.predict_on_batch(to_model_input(batch))) if len(batch_paths) else np.zeros((0, 1))
+        yield batch_paths, probs, errors
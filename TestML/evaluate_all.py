@@ -0,0 +1,229 @@
+# evaluate_all.py
+# Evaluates the model on a whole class-per-folder dataset in one run:
+#
+#   dataset/
+#       banana_ripe/  banana_rotten/  banana_unripe/
+#       strawberry_ripe/ ...          tomato_unripe/
+#
+# Folder names are matched against fruit_ident.class_labels (the order the model
+# was trained with). Produces the 9x9 confusion matrix, per-class precision /
+# recall / F1 and inference latency stats. Predictions are cached in SQLite keyed
+# by (file content hash, model hash), so re-running after adding images only
+# runs the model on the new ones, and swapping the model invalidates everything.
+#
+#   python evaluate_all.py --dataset "C:\...\TestML\dataset" --out MLtest_all.xlsx
+
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(here), "Fully Auto"))
+
+import fruit_ident
+from fruit_ident import class_labels
+from eval_pipeline import list_images, stream_batches, to_model_input, PreprocessCache
+from preprocess_cache import file_digest as file_sha256
+
+# === Paths ===
+dataset_dir = r"C:\Users\hitis\Desktop\Applied Robotics\Report\Codes\TestML\dataset"
+output_excel = r"C:\Users\hitis\Desktop\Applied Robotics\Report\Codes\TestML\MLtest_all.xlsx"
+cache_path = os.path.join(here, "prediction_cache.sqlite")
+
+n_classes = len(class_labels)
+
+# === Hashing ===
+def model_sha256(path):
+    # .keras is a single file; SavedModel directories are hashed file by file
+    if os.path.isdir(path):
+        h = hashlib.sha256()
+        for root, _, files in sorted(os.walk(path)):
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                h.update(os.path.relpath(full, path).encode())
+                h.update(file_sha256(full).encode())
+        return h.hexdigest()
+    return file_sha256(path)
+
+# === Dataset ===
+def class_index(folder_name):
+    # Accept both 'tomato_ripe' and the older 'tomato_ripeness_ripe' spelling
+    name = folder_name.lower().replace("_ripeness_", "_")
+    return class_labels.index(name) if name in class_labels else None
+
+def scan_dataset(root):
+    paths, labels = [], []
+    for folder in sorted(Path(root).iterdir()):
+        if not folder.is_dir():
+            continue
+        idx = class_index(folder.name)
+        if idx is None:
+            print(f"Skipping folder '{folder.name}' (not one of {class_labels})")
+            continue
+        images = list_images(folder)
+        paths.extend(images)
+        labels.extend([idx] * len(images))
+    return paths, np.asarray(labels, dtype=np.int64)
+
+# === Prediction cache ===
+class PredictionCache:
+    def __init__(self, path=cache_path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            "file_hash TEXT, model_hash TEXT, probs BLOB, latency REAL, "
+            "PRIMARY KEY (file_hash, model_hash))"
+        )
+
+    def lookup(self, file_hashes, model_hash):
+        found = {}
+        hashes = list(set(file_hashes))
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT file_hash, probs, latency FROM predictions WHERE model_hash = ? "
+                f"AND file_hash IN ({','.join('?' * len(chunk))})", [model_hash, *chunk]
+            )
+            for file_hash, blob, latency in rows:
+                found[file_hash] = (np.frombuffer(blob, dtype=np.float32), latency)
+        return found
+
+    def store(self, entries, model_hash):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)",
+            [(h, model_hash, np.asarray(p, dtype=np.float32).tobytes(), lat) for h, p, lat in entries]
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+# === Inference ===
+def predict_paths(model, paths, batch_size=32, tensor_cache=None):
+    # Returns (probs (N, C), per-image latency (N,)) for the decodable paths, plus errors
+    probs, latency, ok_paths, errors = [], [], [], []
+    for batch_paths, batch, batch_errors in stream_batches(paths, batch_size, cache=tensor_cache):
+        errors.extend(batch_errors)
+        if not batch_paths:
+            continue
+        x = to_model_input(batch)
+        start = time.perf_counter()
+        p = np.asarray(model.predict_on_batch(x), dtype=np.float32)
+        elapsed = time.perf_counter() - start
+        probs.append(p)
+        latency.append(np.full(len(batch_paths), elapsed / len(batch_paths)))
+        ok_paths.extend(batch_paths)
+    if not probs:
+        return ok_paths, np.empty((0, n_classes), np.float32), np.empty(0), errors
+    return ok_paths, np.concatenate(probs), np.concatenate(latency), errors
+
+def evaluate(paths, labels, model_path, cache, batch_size=32, tensor_cache=None):
+    model_hash = model_sha256(model_path)
+    t0 = time.perf_counter()
+    file_hashes = [file_sha256(p) for p in paths]
+    print(f"Hashed {len(paths)} images in {time.perf_counter() - t0:.1f} s")
+
+    cached = cache.lookup(file_hashes, model_hash)
+    missing = [i for i, h in enumerate(file_hashes) if h not in cached]
+    print(f"{len(paths) - len(missing)} cached predictions, {len(missing)} to infer")
+
+    if missing:
+        # Cached results are keyed by this model file, so run it in-process whatever
+        # FRUIT_IDENT_BACKEND points at (a TFLite export or the server's model)
+        fruit_ident.backend = "local"
+        fruit_ident.model_path = model_path
+        model = fruit_ident.get_model()
+        index_of = {paths[i]: i for i in missing}
+        ok_paths, probs, latency, errors = predict_paths(model, [paths[i] for i in missing], batch_size, tensor_cache)
+        for path, error in errors:
+            print(f"Error with {path}: {error}")
+        new = [(file_hashes[index_of[p]], pr, lat) for p, pr, lat in zip(ok_paths, probs, latency)]
+        cache.store(new, model_hash)
+        cached.update((h, (pr, lat)) for h, pr, lat in new)
+
+    keep = np.array([h in cached for h in file_hashes], dtype=bool)
+    probs = np.stack([cached[h][0] for h, k in zip(file_hashes, keep) if k]) if keep.any() \
+        else np.empty((0, n_classes), np.float32)
+    latency = np.array([cached[h][1] for h, k in zip(file_hashes, keep) if k], dtype=np.float64)
+    return [p for p, k in zip(paths, keep) if k], labels[keep], probs, latency
+
+# === Metrics (vectorised) ===
+def confusion_matrix(y_true, y_pred, n=n_classes):
+    # Rows: true class, columns: predicted class
+    return np.bincount(y_true * n + y_pred, minlength=n * n).reshape(n, n)
+
+def per_class_metrics(cm):
+    tp = np.diag(cm).astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = tp / cm.sum(axis=0)
+        recall = tp / cm.sum(axis=1)
+        f1 = 2 * precision * recall / (precision + recall)
+    return pd.DataFrame({
+        "Class": class_labels, "Support": cm.sum(axis=1),
+        "Precision": precision, "Recall": recall, "F1": f1
+    })
+
+def latency_stats(latency):
+    if latency.size == 0:
+        return {}
+    p50, p95, p99 = np.percentile(latency, [50, 95, 99])
+    return {"mean_ms": 1e3 * latency.mean(), "p50_ms": 1e3 * p50, "p95_ms": 1e3 * p95, "p99_ms": 1e3 * p99}
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the fruit model on a class-per-folder dataset")
+    parser.add_argument("--dataset", default=dataset_dir, help="root folder with one sub-folder per class")
+    parser.add_argument("--model", default=fruit_ident.model_path, help="model file to evaluate")
+    parser.add_argument("--out", default=output_excel, help="Excel report path")
+    parser.add_argument("--cache", default=cache_path, help="SQLite prediction cache")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--no-tensor-cache", action="store_true", help="decode every image instead of using the preprocess cache")
+    args = parser.parse_args()
+
+    paths, labels = scan_dataset(args.dataset)
+    if not paths:
+        print(f"No images found under {args.dataset}")
+        return
+
+    cache = PredictionCache(args.cache)
+    try:
+        tensor_cache = None if args.no_tensor_cache else PreprocessCache()
+        paths, labels, probs, latency = evaluate(paths, labels, args.model, cache, args.batch_size, tensor_cache)
+    finally:
+        cache.close()
+
+    predicted = probs.argmax(axis=1)
+    cm = confusion_matrix(labels, predicted)
+    metrics = per_class_metrics(cm)
+    accuracy = np.trace(cm) / cm.sum()
+    stats = latency_stats(latency)
+
+    print(f"\nAccuracy: {accuracy:.3f} on {cm.sum()} images")
+    print("\nConfusion matrix (rows = true, columns = predicted):")
+    print(pd.DataFrame(cm, index=class_labels, columns=class_labels).to_string())
+    print("\n" + metrics.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    if stats:
+        print("\nInference latency per image: " + ", ".join(f"{k} {v:.2f}" for k, v in stats.items()))
+
+    names = np.array(class_labels)
+    predictions = pd.DataFrame({
+        "Image": [str(p) for p in paths], "True": names[labels], "Predicted": names[predicted],
+        "Confidence": probs.max(axis=1), "Misclassified": (labels != predicted).astype(int)
+    })
+    with pd.ExcelWriter(args.out) as writer:
+        predictions.to_excel(writer, sheet_name="Predictions", index=False)
+        pd.DataFrame(cm, index=class_labels, columns=class_labels).to_excel(writer, sheet_name="Confusion")
+        metrics.to_excel(writer, sheet_name="Per class", index=False)
+        pd.DataFrame([{"Accuracy": accuracy, "Images": int(cm.sum()), **stats}]).to_excel(
+            writer, sheet_name="Summary", index=False)
+    print(f"\n✅ Excel saved: {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#NETWORK TELEOPERATION CLIENT: SENDS JOINT, TASK-SPACE AND GRIPPER COMMANDS TO
+#teleop_server.py OVER UDP AND RECEIVES THE ARM STATE. --demo RUNS A SCRIPTED
+#SWEEP AND REPORTS END-TO-END COMMAND LATENCY; OTHERWISE COMMANDS ARE TYPED IN
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Fully Auto"))
+import teleop_protocol as proto
+
+heartbeat_period = 0.1   # s, well inside the server's dead-man timeout
+
+class TeleopClient:
+    def __init__(self, host="127.0.0.1", port=proto.default_port):
+        self.server = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.settimeout(0.2)
+        self.seq = 0
+        self.state = None
+        self.last_state_seq = None
+        # (sent, applied, received) per acknowledged command
+        self.latency = []
+        self._acked = None
+        self._last_send = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._receiver = threading.Thread(target=self._receive, name="TeleopState", daemon=True)
+        self._receiver.start()
+        self._heartbeat = threading.Thread(target=self._keepalive, name="TeleopHeartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def _send(self, kind, values=(0.0, 0.0, 0.0, 0.0), gripper=float("nan")):
+        with self._lock:
+            self.seq += 1
+            sent = time.perf_counter()
+            self.sock.sendto(proto.pack_command(kind, self.seq, sent, values, gripper), self.server)
+            self._last_send = sent
+
+    def send_joints(self, phi, gripper=float("nan")):
+        self._send(proto.JOINT, tuple(float(v) for v in phi[0:4]), gripper)
+
+    def send_task(self, position, gamma=0.0, gripper=float("nan")):
+        self._send(proto.TASK, (float(position[0]), float(position[1]), float(position[2]), float(gamma)), gripper)
+
+    def send_gripper(self, gripper):
+        self._send(proto.GRIPPER, gripper=gripper)
+
+    def _keepalive(self):
+        # Heartbeats only when the operator is idle, so holding still doesn't trip the dead-man
+        while not self._stop.wait(heartbeat_period / 2):
+            if time.perf_counter() - self._last_send >= heartbeat_period:
+                self._send(proto.HEARTBEAT)
+
+    def _receive(self):
+        while not self._stop.is_set():
+            try:
+                data = self.sock.recv(256)
+            except socket.timeout:
+                continue
+            except OSError:
+                if self._stop.is_set():
+                    break
+                continue
+            received = time.perf_counter()
+            state = proto.unpack_state(data)
+            if state is None:
+                continue
+            seq, ack, flags, echo, applied, joints = state
+            if self.last_state_seq is not None and not proto.newer(seq, self.last_state_seq):
+                continue  # reordered, older than what we already have
+            self.last_state_seq = seq
+            self.state = (np.array(joints), flags, received)
+            if ack != self._acked and echo > 0:
+                self._acked = ack
+                self.latency.append((echo, applied, received))
+
+    def latency_report(self):
+        if not self.latency:
+            return "No acknowledged commands."
+        samples = np.array(self.latency)
+        one_way = 1e3 * (samples[:, 1] - samples[:, 0])
+        rtt = 1e3 * (samples[:, 2] - samples[:, 0])
+        lines = [f"{len(samples)} commands acknowledged"]
+        for name, values in (("command -> arm (ms)", one_way), ("command -> state (ms)", rtt)):
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            lines.append(f"{name:<22} p50 {p50:6.2f}  p95 {p95:6.2f}  p99 {p99:6.2f}  max {values.max():6.2f}")
+        return "\n".join(lines)
+
+    def close(self):
+        self._stop.set()
+        self._heartbeat.join(1.0)
+        self.sock.close()
+        self._receiver.join(1.0)
+
+def run_demo(client, seconds, rate):
+    # Sinusoidal base sweep (+-20 deg) with the gripper opening and closing
+    print(f"Demo: sweeping the base for {seconds:.0f} s at {rate:.0f} Hz...")
+    period = 1.0 / rate
+    start = time.perf_counter()
+    i = 0
+    while time.perf_counter() - start < seconds:
+        t = i * period
+        phi = [np.deg2rad(20) * np.sin(2 * np.pi * 0.25 * t), 0.0, 0.0, 0.0]
+        client.send_joints(phi, gripper=0.5 + 0.5 * np.sin(2 * np.pi * 0.1 * t))
+        i += 1
+        delay = start + i * period - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    time.sleep(0.1)
+    print(client.latency_report())
+
+def run_console(client):
+    print(
+        "--- Commands ---\n"
+        "j a1 a2 a3 a4 [g]   joint angles (deg), optional gripper 0..1\n"
+        "t x y z [g]         task-space target (m), optional gripper\n"
+        "g value             gripper only\n"
+        "s                   show measured joints\n"
+        "q                   quit\n"
+    )
+    while True:
+        line = input("> ").split()
+        if not line:
+            continue
+        if line[0] == "q":
+            break
+        try:
+            values = [float(v) for v in line[1:]]
+            if line[0] == "j" and len(values) in (4, 5):
+                client.send_joints(np.deg2rad(values[0:4]), values[4] if len(values) == 5 else float("nan"))
+            elif line[0] == "t" and len(values) in (3, 4):
+                client.send_task(values[0:3], 0.0, values[3] if len(values) == 4 else float("nan"))
+            elif line[0] == "g" and len(values) == 1:
+                client.send_gripper(values[0])
+            elif line[0] == "s":
+                if client.state is None:
+                    print("No state received yet.")
+                else:
+                    joints, flags, _ = client.state
+                    status = " (dead-man hold)" if flags & proto.FLAG_DEADMAN else ""
+                    status += " (last target unreachable)" if flags & proto.FLAG_REJECTED else ""
+                    print(f"Joints (deg): {np.around(np.rad2deg(joints[0:4]), 2)}  Gripper: {joints[4]:.2f}{status}")
+            else:
+                print("Invalid command.")
+        except ValueError:
+            print("Invalid input.")
+
+def main():
+    parser = argparse.ArgumentParser(description="QArm UDP teleoperation client")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=proto.default_port)
+    parser.add_argument("--demo", action="store_true", help="scripted sweep with a latency report")
+    parser.add_argument("--seconds", type=float, default=10.0, help="demo length")
+    parser.add_argument("--rate", type=float, default=100.0, help="demo command rate (Hz)")
+    args = parser.parse_args()
+
+    client = TeleopClient(args.host, args.port)
+    try:
+        if args.demo:
+            run_demo(client, args.seconds, args.rate)
+        else:
+            run_console(client)
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#NETWORK TELEOPERATION SERVER: RUNS NEXT TO THE ARM AND ACCEPTS JOINT, TASK-SPACE
+#AND GRIPPER COMMANDS OVER UDP (SEE Fully Auto/teleop_protocol.py), STREAMING THE
+#MEASURED JOINT POSITIONS BACK TO THE OPERATOR AT A FIXED RATE
+import os
+import sys
+import time
+import socket
+import argparse
+import numpy as np
+
+# Shared modules; qarm_backend adds the QArm library paths (or the simulator with QARM_BACKEND=sim)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Fully Auto"))
+
+from qarm_backend import QArm, QArmUtilities
+from qarm_kinematics import JOINT_LIMITS, within_limits
+import teleop_protocol as proto
+
+control_rate = 200.0      # Hz, read_write_std every tick
+state_rate = 100.0        # Hz, state packets to the operator
+deadman_timeout = 0.25    # s without a command or heartbeat -> hold position
+
+class TeleopServer:
+    def __init__(self, myArm, host="127.0.0.1", port=proto.default_port):
+        self.myArm = myArm
+        self.utilities = QArmUtilities()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.setblocking(False)
+
+        self.phiCmd = np.array(myArm.measJointPosition[0:4], dtype=np.float64)
+        self.gripCmd = 0.0
+        self.led_cmd = np.array([0, 1, 0], dtype=np.float64)
+        self.client = None
+        self.last_seq = None
+        self.last_sent = 0.0
+        self.last_applied = 0.0
+        self.last_heard = None
+        self.flags = proto.FLAG_DEADMAN
+        self.stats = {"received": 0, "applied": 0, "stale": 0, "malformed": 0, "rejected": 0, "deadman": 0}
+
+    def _drain(self):
+        # Read every pending datagram; only the newest valid command is kept
+        newest = None
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(256)
+            except (BlockingIOError, InterruptedError):
+                break
+            except ConnectionResetError:
+                # Windows reports an unreachable client on the next recv
+                continue
+            packet = proto.unpack_command(data)
+            if packet is None:
+                self.stats["malformed"] += 1
+                continue
+            self.stats["received"] += 1
+            seq = packet[1]
+            if addr != self.client:
+                # New operator (or a restarted client, which counts from 1 again)
+                self.last_seq = None
+                newest = None
+            if self.last_seq is not None and not proto.newer(seq, self.last_seq):
+                # Duplicate or overtaken by a newer command
+                self.stats["stale"] += 1
+                continue
+            if newest is not None:
+                self.stats["stale"] += 1
+            self.last_seq = seq
+            self.client = addr
+            newest = packet
+        return newest
+
+    def _apply(self, packet, now):
+        kind, seq, sent, values, gripper = packet
+        self.last_heard = now
+        if self.flags & proto.FLAG_DEADMAN:
+            print("Operator connected, accepting commands.")
+        self.flags &= ~proto.FLAG_DEADMAN
+        self.last_sent = sent
+        if kind == proto.HEARTBEAT:
+            return
+
+        if kind == proto.JOINT:
+            self.phiCmd = np.clip(np.array(values), JOINT_LIMITS[:, 0], JOINT_LIMITS[:, 1])
+            self.flags &= ~proto.FLAG_REJECTED
+        elif kind == proto.TASK:
+            position, gamma = np.array(values[0:3]), values[3]
+            _, phiCmd = self.utilities.qarm_inverse_kinematics(position, gamma, self.myArm.measJointPosition[0:4])
+            if np.any(np.isnan(phiCmd)) or not within_limits(phiCmd):
+                self.stats["rejected"] += 1
+                self.flags |= proto.FLAG_REJECTED
+            else:
+                self.phiCmd = np.array(phiCmd, dtype=np.float64)
+                self.flags &= ~proto.FLAG_REJECTED
+        if not np.isnan(gripper):
+            self.gripCmd = float(np.clip(gripper, 0.0, 1.0))
+        self.stats["applied"] += 1
+
+    def _deadman(self, now):
+        if self.flags & proto.FLAG_DEADMAN or self.last_heard is None:
+            return
+        if now - self.last_heard > deadman_timeout:
+            # Hold where the arm is now rather than finishing the last motion
+            self.phiCmd = np.array(self.myArm.measJointPosition[0:4], dtype=np.float64)
+            self.flags |= proto.FLAG_DEADMAN
+            # The next command starts a new session, whatever its sequence number
+            self.last_seq = None
+            self.stats["deadman"] += 1
+            print(f"Dead-man timeout ({deadman_timeout * 1e3:.0f} ms without a command), holding position.")
+
+    def run(self, duration=None):
+        period = 1.0 / control_rate
+        state_every = max(1, int(round(control_rate / state_rate)))
+        start = begin = time.perf_counter()
+        tick = 0
+        state_seq = 0
+        while self.myArm.status:
+            packet = self._drain()
+            now = time.perf_counter()
+            if packet is not None:
+                self._apply(packet, now)
+            else:
+                self._deadman(now)
+
+            self.myArm.read_write_std(phiCMD=self.phiCmd, gprCMD=self.gripCmd, baseLED=self.led_cmd)
+            if packet is not None:
+                self.last_applied = time.perf_counter()
+
+            tick += 1
+            if self.client is not None and tick % state_every == 0:
+                state = proto.pack_state(state_seq, self.last_seq or 0, self.flags, self.last_sent,
+                                         self.last_applied, self.myArm.measJointPosition[0:5])
+                state_seq += 1
+                try:
+                    self.sock.sendto(state, self.client)
+                except OSError:
+                    pass
+
+            if duration is not None and now - begin >= duration:
+                break
+            delay = start + tick * period - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -period:
+                # Overrun: restart the schedule instead of bursting
+                start, tick = time.perf_counter(), 0
+
+    def close(self):
+        self.sock.close()
+        print("--- Teleop server: " + ", ".join(f"{k} {v}" for k, v in self.stats.items()) + " ---")
+
+def main():
+    parser = argparse.ArgumentParser(description="QArm UDP teleoperation server")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (0.0.0.0 for the lab network)")
+    parser.add_argument("--port", type=int, default=proto.default_port)
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    args = parser.parse_args()
+
+    with QArm(hardware=0) as myArm:
+        myArm.read_std()
+        server = TeleopServer(myArm, args.host, args.port)
+        print(f"Listening on udp://{args.host}:{args.port} (Ctrl+C to stop)")
+        try:
+            server.run(args.duration)
+        except KeyboardInterrupt:
+            print("Stopping.")
+        finally:
+            server.close()
+
+if __name__ == "__main__":
+    main()